@@ -1,6 +1,6 @@
 ##############################################################################
 # Developed by: Matthew Bone
-# Last Updated: 01/10/2020
+# Last Updated: 18/10/2026
 # Updated by: Matthew Bone
 #
 # Contact Details:
@@ -17,15 +17,16 @@
 #
 # The wildcard functions compress labels with unnecessary flags into labels with
 # a wildcard (*). K is set at 700/2 as K values must be divided prior to the
-# LAMMPS style calculation. Bond orders are given to the bondWrite function
-# which writes coefficients for the labels at a given stage of the if statement
-# check. b1/b2 flags are handled first for higher priority.
+# LAMMPS style calculation. R0 and the bond order multipliers of every pair of
+# labels are computed as arrays, the multipliers from the flag bits of each
+# label (Dreiding_label_dictionary) with b1/b2 flags handled first for higher
+# priority, and both files are written at once.
 ##############################################################################
 
 # Import packages
 import os
-import pandas as pd
 import numpy as np
+import Dreiding_label_dictionary as ld
 from Dreiding_label_dictionary import labelDict
 
 os.chdir("/home/matt/Documents/Dreiding_forcefield")
@@ -81,79 +82,33 @@ wildcard(["Sb_3_d2", "Sb_3_d3", "Sb_3_d4"], "Sb_3*")
 wildcard(["Te_3_d1", "Te_3_d2", "Te_3_d3", "Te_3_d5"], "Te_3*")
 
 #List of keys from dictionary
-keys = list(subDict.keys())
+keys = np.array(list(subDict.keys()))
 
 # Dictionary of bond radii according to DREIDING
 atomClasses = {key: subDict[key][1] for key in subDict.keys()}
+radii = np.array(list(atomClasses.values()))
 
-# Empty dataframe with rows and columns labelled as keys
-R0 = pd.DataFrame([], index = [keys], columns = [keys])
-
-
-# R0 calculation from DREIDING
-for i in range(len(atomClasses)):
-    for j in range(len(atomClasses)):
-        R0.loc[keys[i],keys[j]] = atomClasses[keys[i]] + atomClasses[keys[j]] - 0.01
-
-
-# Convert pandas dataframe to numpy matrix so the diagonal can be found
-R0 = R0.to_numpy()
-R0 = R0.astype('float64')
-R0 = np.asmatrix(R0)
-R0 = np.tril(R0)
-R0 = np.around(R0, decimals = 3)
+# R0 calculation from DREIDING for every pair, keeping values on and below the
+# diagonal so each bond is written once
+R0 = np.around(radii[:, None] + radii[None, :] - 0.01, decimals = 3)
+rows, columns = np.tril_indices(len(keys))
 
 # Set K in (kcal/mol)/A**2
 K = 700/2
 
-# Create files for bond by type and bond coeff
-file_type = open("bondsType.txt", "w")
-file_coeff = open("bondsCoeff.txt", "w")
-
-# Store of previously formed bondNames
-def bondWrite(multiplier):
-        bondName = keys[i] + "-" + keys[j]
-        bondName = bondName.replace("*", "w")
-
-        # Write to files and append bondName to prevBond
-        file_type.write("@bond:" + bondName + " @atom:" + keys[i] + " @atom:" + keys[j] + "\n")
-        file_coeff.write("bond_coeff @bond:" + bondName + " " + str(K*multiplier) + " " + str(R0[i, j]) + "\n")
-
-
-for i in range(len(atomClasses)):
-    for j in range(len(atomClasses)):
-        if R0[i,j] == 0: # Skip zero value cells in matrix
-            continue
-
-        # Catch X_b1-x_b1 bonds
-        if "_b1" in keys[i] and "_b1" in keys[j]:
-            bondWrite(1)
-
-        # Catch X_2_b2-X_2_b2 bonds where bond order is 2
-        elif "_b2" in keys[i] and "_b2" in keys[j]:
-            bondWrite(2)
-
-        # Catch X_2_b2-X_2 bonds where bond order is 1
-        elif "_b2" in keys[i] and "_2" in keys[j]:
-            bondWrite(1)
-        elif "_2" in keys[i] and "_b2" in keys[j]:
-            bondWrite(1)
-
-        # Catch X_1-X_1 bonds where the bond order will always be 3
-        elif "_1" in keys[i] and "_1" in keys[j]:
-            bondWrite(3)
-
-        # Catch X_2-X_2 bonds where the bond order will always be 2
-        elif "_2" in keys[i] and "_2" in keys[j]:
-            bondWrite(2)
-
-        # Catch X_R-X_R bonds where the bond order will always be 1.5
-        elif "_R" in keys[i] and "_R" in keys[j]:
-            bondWrite(1.5)
-
-        # If not a specialist case, handle writing in a general fashion
-        else:
-            bondWrite(1)
-
-file_type.close()
-file_coeff.close()
+# Bond order multipliers from the label table flag bits
+labelFlags = ld.labelColumns(keys)["Flags"]
+multiplier = ld.labelBondOrders(labelFlags[rows], labelFlags[columns])
+
+# Bond names and coefficients
+atomsI = keys[rows]
+atomsJ = keys[columns]
+bondNames = np.char.replace(np.char.add(np.char.add(atomsI, "-"), atomsJ), "*", "w")
+typeLines = ["@bond:" + bondName + " @atom:" + atomI + " @atom:" + atomJ + "\n" for bondName, atomI, atomJ in zip(bondNames.tolist(), atomsI.tolist(), atomsJ.tolist())]
+coeffLines = ["bond_coeff @bond:" + bondName + " " + str(k) + " " + str(r0) + "\n" for bondName, k, r0 in zip(bondNames.tolist(), (K * multiplier).tolist(), R0[rows, columns].tolist())]
+
+# Write bond by type and bond coeff files
+with open("bondsType.txt", "w") as file_type:
+    file_type.write("".join(typeLines))
+with open("bondsCoeff.txt", "w") as file_coeff:
+    file_coeff.write("".join(coeffLines))
@@ -1,6 +1,6 @@
 ##############################################################################
 # Developed by: Matthew Bone
-# Last Updated: 04/12/2020
+# Last Updated: 18/10/2026
 # Updated by: Matthew Bone
 #
 # Contact Details:
@@ -16,241 +16,165 @@
 # of the force field. Labels are taken from the Dreiding_label_dictionary. The
 # dihedral calculation is the most complicated of all the force field components
 # as it relies on 10 different cases to catagorise all possible dihedral
-# coefficients. As such this file may take around 30 seconds to compute.
+# coefficients.
 #
-# All cases are built by subsetting the main label dictionary.
-# The wildcard functions compress labels with unnecessary flags into labels with
-# a wildcard (*). This is done later in some case dictionaries as flags are
-# required to subset the main dictionary. Constants can be changed for each case
-# at the start of each case. All DREIDING dihedral cases only use the dihedral
-# bonding atoms, apart from Case J. No dihedral type names should be repeated;
-# there is a check to generate an error if this is happens. Case I is at the
+# The cases are data: caseTable gives each case's energy, multiplicity, phase
+# shift and predicates that pick its J, K (and I) labels with the flag bits
+# of the label table (Dreiding_label_dictionary), which are computed once.
+# evaluateCase builds every combination of a case as one array operation.
+# wildcardLabels compresses labels with unnecessary flags into labels with a
+# wildcard (*); the X_2 and X_R J atoms of some cases use further wildcards.
+# Constants can be changed for each case above the table. All DREIDING
+# dihedral cases only use the dihedral bonding atoms, apart from Case J. No
+# dihedral type names should be repeated; each name is checked as it is
+# written and an error names the two cases that gave it. Case I is at the
 # bottom so that it has priority when computed by Moltemplate
+#
+# Rules are stored by case and written at the end. When COMPACT_RULES is True
+# each case is replaced by the smallest set of wildcard rules found that gives
+# every quadruple of labels in the label dictionary the same coefficients as
+# the full rule list; see compactDihedrals in Dreiding_rules.py. Cases that
+# can't be compacted safely are written out in full. Compacted rules that are
+# overridden by later cases for every label they match are then dropped using
+# reachableRules.
 ##############################################################################
 
 # Import packages
 import os
+import numpy as np
+import Dreiding_rules as dr
+import Dreiding_label_dictionary as ld
 from Dreiding_label_dictionary import labelDict
 
 os.chdir("/home/matt/Documents/XP_Project/Dreiding_forcefield")
 
-subDict = labelDict
+# Concrete labels are stored before the wildcards replace them
+labels = list(labelDict.keys())
+
+# Write each case as a compact set of wildcard rules
+COMPACT_RULES = True
+
+# Replace groups of labels with a single wildcard label. groups is a list of
+# (labels, replacement); each replacement goes to the end of the dictionary and
+# takes the value of the last label in its group.
+def wildcardLabels(labelValues, groups):
+    labelValues = dict(labelValues)
+    for group, replacement in groups:
+        for value in group:
+            labelValues[replacement] = labelValues.pop(value)
+
+    return labelValues
+
+# Reducing labels with replacement wildcard - ([], )
+labelWildcards = [
+    # Hydrogen
+    (["H", "H_HB", "H_B"], "H*"),
+
+    # Carbon
+    (["C_3", "C_34", "C_33", "C_32", "C_31"], "C_3*"),
+    (["C_R", "C_R1", ], "C_R*"),
+    (["C_R_b1", "C_R1_b1"], "C_R*_b1"),
+    (["C_1", "C_1_b1"], "C_1*"),
+
+    # Nitrogen
+    (["N_3", "N_3_ha", "N_3_hd"], "N_3*"),
+    (["N_R_d1", "N_R_d1_ha"], "N_R_d1*"),
+    (["N_R_d2", "N_R_d2_ha", "N_R_d2_hd"], "N_R_d2*"),
+    (["N_R_b1_d2", "N_R_b1_d2_ha", "N_R_b1_d2_hd"], "N_R_b1_d2*"),
+    (["N_2_d1", "N_2_d1_ha", "N_2_d1_hd"], "N_2_d1*"),
+    (["N_2_b1_d1", "N_2_b1_d1_ha"], "N_2_b1_d1*"),
+    (["N_2_b2_d1", "N_2_b2_d1_ha"], "N_2_b2_d1*"),
+    (["N_2_d2", "N_2_d2_ha", "N_2_d2_hd"], "N_2_d2*"),
+    (["N_2_b1_d2", "N_2_b1_d2_ha", "N_2_b1_d2_hd"], "N_2_b1_d2*"),
+    (["N_2_b2_d2", "N_2_b2_d2_ha", "N_2_b2_d2_hd"], "N_2_b2_d2*"),
+    (["N_1", "N_1_ha"], "N_1*"),
+
+    # Oxygen
+    (["O_3", "O_3_ha", "O_3_hd"], "O_3*"),
+    (["O_R", "O_R_ha"], "O_R*"),
+    (["O_2_b1", "O_2_b1_ha", "O_2_b1_hd"], "O_2_b1*"),
+    (["O_2_b2", "O_2_b2_ha"], "O_2_b2*"),
+    (["O_1", "O_1_ha"], "O_1*"),
+
+    # Fluorine
+    (["F", "F_hd", "F_ha"], "F*"),
+]
+
+# Further wildcards for the X_2 and X_R J atoms of Cases B, I and J. These
+# are allowed as these cases are suitably unique so as to not interfer with
+# other Cases
+sp2Wildcards = [
+    (["C_2", "C_2_b1", "C_2_b2"], "C_2*"),
+    (["C_R*", "C_R*_b1"], "C_R*"),
+    (["B_2_d1", "B_2_b1_d1", "B_2_b2_d1"], "B_2*_d1"),
+    (["B_2_d2", "B_2_b1_d2", "B_2_b2_d2"], "B_2*_d2"),
+    (["N_R_d2*", "N_R_b1_d2*"], "N_R*_d2*"),
+    (["N_2_d1*", "N_2_b1_d1*", "N_2_b2_d1*"], "N_2*_d1*"),
+    (["N_2_d2*", "N_2_b1_d2*", "N_2_b2_d2*"], "N_2*_d2*"),
+    (["O_2", "O_2_ha", "O_2_b1*", "O_2_b2*"], "O_2*"),
+]
 
-# Replace many labels with a single wildcard label
-# Wildcard function drops values and replaces them with replacement
-def wildcard(list, replacement):
-    for value in list:
-        subDict[replacement] = subDict.pop(value)
+# Number of possible atomic bonds, aside from the J-K bond in question
+possibleAtoms = wildcardLabels({key: value[3] for key, value in labelDict.items()}, labelWildcards)
 
-def wildcardCases(list, replacement, dict):
-    for value in list:
-        dict[replacement] = dict.pop(value)
+# X_3 labels in column 16 are treated differently (oxygen, sulphur, etc.)
+# Label attributes are the label table columns (element, flag bits and d
+# flag) with Column16 added, computed once for each label set
+def labelAttributes(labelNames):
+    attributes = ld.labelColumns(labelNames)
+    column16Elements = np.isin(attributes["Element"], ld.COLUMN16_ELEMENTS)
+    attributes["Column16"] = column16Elements & allFlags(attributes, ld.SP3)
 
-def writeOutput(ENERGY, MULTIPLICITY, PHASE_SHIFT, *args):
-    # Change string if case has 3 atoms
-    if len(args) == 2:
-        firstTerm = " @atom:*"
+    return attributes
 
-        # Create type name for dihedral, remove wildcard * if present
-        dihedralName = '-'.join(args)
-        dihedralName = dihedralName.replace("*", "w")
-    else:
-        firstTerm = " @atom:" + args[2]
-
-        # Create type name for dihedral, remove wildcard * if present
-        atomLabels = [args[2], args[0], args[1]]
-        dihedralName = '-'.join(atomLabels)
-        dihedralName = dihedralName.replace("*", "w")
-    # Writes to files, calculate barrier energy and add key combo to list
-    file_type.write("@dihedral:" + dihedralName + firstTerm + " @atom:" + args[0] + " @atom:" + args[1] + " @atom:*\n")
-    barrierEnergy = str(round(ENERGY / (valueJ * valueK), 4))
-    file_coeff.write("dihedral_coeff @dihedral:" + dihedralName + " " + barrierEnergy + " " + str(MULTIPLICITY) + " " + str(PHASE_SHIFT) + " 0.000\n")
-    typeNames.append(dihedralName)
-
-# Reducing labels with replacement wildcard - wildcard([], )
-# Hydrogen
-wildcard(["H", "H_HB", "H_B"], "H*")
-
-# Carbon
-wildcard(["C_3", "C_34", "C_33", "C_32", "C_31"], "C_3*")
-wildcard(["C_R", "C_R1", ], "C_R*")
-wildcard(["C_R_b1", "C_R1_b1"], "C_R*_b1")
-wildcard(["C_1", "C_1_b1"], "C_1*")
-
-# Nitrogen
-wildcard(["N_3", "N_3_ha", "N_3_hd"], "N_3*")
-wildcard(["N_R_d1", "N_R_d1_ha"], "N_R_d1*")
-wildcard(["N_R_d2", "N_R_d2_ha", "N_R_d2_hd"], "N_R_d2*")
-wildcard(["N_R_b1_d2", "N_R_b1_d2_ha", "N_R_b1_d2_hd"], "N_R_b1_d2*")
-wildcard(["N_2_d1", "N_2_d1_ha", "N_2_d1_hd"], "N_2_d1*")
-wildcard(["N_2_b1_d1", "N_2_b1_d1_ha"], "N_2_b1_d1*")
-wildcard(["N_2_b2_d1", "N_2_b2_d1_ha"], "N_2_b2_d1*")
-wildcard(["N_2_d2", "N_2_d2_ha", "N_2_d2_hd"], "N_2_d2*")
-wildcard(["N_2_b1_d2", "N_2_b1_d2_ha", "N_2_b1_d2_hd"], "N_2_b1_d2*")
-wildcard(["N_2_b2_d2", "N_2_b2_d2_ha", "N_2_b2_d2_hd"], "N_2_b2_d2*")
-wildcard(["N_1", "N_1_ha"], "N_1*")
-
-# Oxygen
-wildcard(["O_3", "O_3_ha", "O_3_hd"], "O_3*")
-wildcard(["O_R", "O_R_ha"], "O_R*")
-wildcard(["O_2_b1", "O_2_b1_ha", "O_2_b1_hd"], "O_2_b1*")
-wildcard(["O_2_b2", "O_2_b2_ha"], "O_2_b2*")
-wildcard(["O_1", "O_1_ha"], "O_1*")
-
-
-# Fluorine
-wildcard(["F", "F_hd", "F_ha"], "F*")
+# Labels with any or all of the given flag bits
+def anyFlag(attributes, flags):
+    return (attributes["Flags"] & flags) != 0
 
-# Number of possible atomic bonds, aside from the J-K bond in question
-possibleAtoms = {key: value[3] for key, value in subDict.items()}
+def allFlags(attributes, flags):
+    return (attributes["Flags"] & flags) == flags
 
-# List of X_3 in column 16 as treated differently (oxygen, sulphur, etc.)
-column16 = ["O_3*", "S_3", "Se_3", "Te_3"]
-
-# Repeated type names list: No type names should appear twice with this methodology
-typeNames = []
-
-# Start dihedral by type and coeff files
-file_type = open("dihedralType.txt", "w")
-file_coeff = open("dihedralCoeff.txt", "w")
+# Label sets the cases choose J, K and I atoms from: names, number of possible
+# bonds and attribute masks, computed once
+labelSets = {}
+sp2Atoms = wildcardLabels(possibleAtoms, sp2Wildcards)
+for setName, setValues in [("all", possibleAtoms), ("sp2", sp2Atoms)]:
+    setNames = np.array(list(setValues.keys()))
+    labelSets[setName] = (setNames, np.array(list(setValues.values())), labelAttributes(setNames))
 
 # Split into dihedral cases from DREIDING paper
+# Constants can be changed for each case here
 # Case A - J,K = X_3
-# Subpriority with Case H
 CASE_A_ENERGY = 2.0/2
 CASE_A_MULTIPLICITY = 3
 CASE_A_PHASE_SHIFT = 180 * CASE_A_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_3" in the key
-caseADictionary = {key: value for key, value in possibleAtoms.items() if "_3" in key}
-
-for keyJ, valueJ in caseADictionary.items():
-    for keyK, valueK in caseADictionary.items():
-
-        # Due to Case H priority - skips column16-column16 bonding pairs
-        if keyJ[0:4] in column16 and keyK[0:4] in column16:
-            continue
-
-        writeOutput(CASE_A_ENERGY, CASE_A_MULTIPLICITY, CASE_A_PHASE_SHIFT, keyJ, keyK)
-
 # Case B - J = X_2, X_R, K = X_3 single bond with one sp2 and sp3 atoms e.g. toluene
 CASE_B_ENERGY = 1.0/2
 CASE_B_MULTIPLICITY = 6
 CASE_B_PHASE_SHIFT = 0 * CASE_B_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_3", "_2" or "_R" in the key
-caseBDictionaryJ = {key: value for key, value in possibleAtoms.items() if "_2" in key or "_R" in key}
-# These changes are allowed as Case B is suitably unique so as to not interfer
-# with other Cases
-wildcardCases(["C_2", "C_2_b1", "C_2_b2"], "C_2*", caseBDictionaryJ)
-wildcardCases(["C_R*", "C_R*_b1"], "C_R*", caseBDictionaryJ)
-wildcardCases(["B_2_d1", "B_2_b1_d1", "B_2_b2_d1"], "B_2*_d1", caseBDictionaryJ)
-wildcardCases(["B_2_d2", "B_2_b1_d2", "B_2_b2_d2"], "B_2*_d2", caseBDictionaryJ)
-wildcardCases(["N_R_d2*", "N_R_b1_d2*"], "N_R*_d2*", caseBDictionaryJ)
-wildcardCases(["N_2_d1*", "N_2_b1_d1*", "N_2_b2_d1*"], "N_2*_d1*", caseBDictionaryJ)
-wildcardCases(["N_2_d2*", "N_2_b1_d2*", "N_2_b2_d2*"], "N_2*_d2*", caseBDictionaryJ)
-wildcardCases(["O_2", "O_2_ha", "O_2_b1*", "O_2_b2*"], "O_2*", caseBDictionaryJ)
-
-caseBDictionaryK = {key: value for key, value in possibleAtoms.items() if "_3" in key}
-
-for keyJ, valueJ in caseBDictionaryJ.items():
-    for keyK, valueK in caseBDictionaryK.items():
-
-        # Due to Case I priority - Case J given priority by MT rather than here
-        if keyK in column16:
-            continue
-
-        writeOutput(CASE_B_ENERGY, CASE_B_MULTIPLICITY, CASE_B_PHASE_SHIFT, keyJ, keyK)
-
 # Case C - J,K = X_2 double bond with two sp2 atoms
 CASE_C_ENERGY = 45.0/2
 CASE_C_MULTIPLICITY = 2
 CASE_C_PHASE_SHIFT = 180 * CASE_C_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_2" in the key
-# Two dictionaries as need one with _b1 and one without
-caseCDictionaryJ = {key: value for key, value in possibleAtoms.items() if "_2" in key}
-caseCDictionaryK = {key: value for key, value in caseCDictionaryJ.items() if "_b1" not in key}
-
-for keyJ, valueJ in caseCDictionaryJ.items():
-    for keyK, valueK in caseCDictionaryK.items():
-
-        # Removes "notb2"-b2 bonds which are single bonds
-        if "_b2" in keyJ and "_b2" not in keyK:
-            continue
-        if "_b2" not in keyJ and "_b2" in keyK:
-            continue
-
-        writeOutput(CASE_C_ENERGY, CASE_C_MULTIPLICITY, CASE_C_PHASE_SHIFT, keyJ, keyK)
-
 # Case D - J,K = X_R resonance bond involving two resonance atoms
 CASE_D_ENERGY = 25.0/2
 CASE_D_MULTIPLICITY = 2
 CASE_D_PHASE_SHIFT = 180 * CASE_D_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_R" in the key
-# Two dictionaries as need one with _b1 and one without
-caseDDictionaryJ = {key: value for key, value in possibleAtoms.items() if "_R" in key}
-caseDDictionaryK = {key: value for key, value in caseDDictionaryJ.items() if "_b1" not in key}
-
-for keyJ, valueJ in caseDDictionaryJ.items():
-    for keyK, valueK in caseDDictionaryK.items():
-
-        writeOutput(CASE_D_ENERGY, CASE_D_MULTIPLICITY, CASE_D_PHASE_SHIFT, keyJ, keyK)
-
 # Case E - J,K = X_2, X_R single bond involving two sp2 or resonant atoms ONLY B1
 CASE_E_ENERGY = 5.0/2
 CASE_E_MULTIPLICITY = 2
 CASE_E_PHASE_SHIFT = 180 * CASE_E_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_R_b1" or "_2_b1" in the key
-# Two dictionaries so that R_b1-R_b1 bonds are left for Case F
-# Split into thirds due to complexity added with the b2 flag
-
-# This third handles b1-b1 bond pairs, apart from R-b1-R-b1 which is Case F
-caseEDictionaryJ = {key: value for key, value in possibleAtoms.items() if "_R_b1" in key or "_R*_b1" in key or "_2_b1" in key}
-caseEDictionaryK = {key: value for key, value in caseEDictionaryJ.items() if "_R_b1" not in key}
-caseEDictionaryK.pop("C_R*_b1")
-
-for keyJ, valueJ in caseEDictionaryJ.items():
-    for keyK, valueK in caseEDictionaryK.items():
-
-        writeOutput(CASE_E_ENERGY, CASE_E_MULTIPLICITY, CASE_E_PHASE_SHIFT, keyJ, keyK)
-
-# Catches b2-notb2 bonds - all bonds for b2 atoms are single bonds unless
-# both atoms have the b2 flag
-caseEDictionaryJ = {key: value for key, value in possibleAtoms.items() if "b2" in key}
-caseEDictionaryK = {key: value for key, value in possibleAtoms.items() if "_2" in key and "b2" not in key}
-
-for keyJ, valueJ in caseEDictionaryJ.items():
-    for keyK, valueK in caseEDictionaryK.items():
-
-        writeOutput(CASE_E_ENERGY, CASE_E_MULTIPLICITY, CASE_E_PHASE_SHIFT, keyJ, keyK)
-
-# Catches dihedrals between X_R and X_2
-caseEDictionaryJ = {key: value for key, value in possibleAtoms.items() if "_R" in key and "_b1" not in key}
-caseEDictionaryK = {key: value for key, value in possibleAtoms.items() if "_2" in key}
-
-for keyJ, valueJ in caseEDictionaryJ.items():
-    for keyK, valueK in caseEDictionaryK.items():
-
-        writeOutput(CASE_E_ENERGY, CASE_E_MULTIPLICITY, CASE_E_PHASE_SHIFT, keyJ, keyK)
-
 # Case F - J,K = X_R
 # Lower so greater priority over case E, which it supersedes in some cases
 CASE_F_ENERGY = 10.0/2
 CASE_F_MULTIPLICITY = 2
 CASE_F_PHASE_SHIFT = 180 * CASE_F_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_R_b1" in the key
-# This handles R_b1-R_b1 bonds
-caseFDictionary = {key: value for key, value in possibleAtoms.items() if "_R_b1" in key or "_R*_b1" in key}
-
-for keyJ, valueJ in caseFDictionary.items():
-    for keyK, valueK in caseFDictionary.items():
-
-        writeOutput(CASE_F_ENERGY, CASE_F_MULTIPLICITY, CASE_F_PHASE_SHIFT, keyJ, keyK)
-
 # Case G - J,K = X_1, monovalent, metal
 # This case is included to make up the numbers in terms of dihderals
 # Uses wildcards to prevent significant addition of lines to force field
@@ -258,86 +182,221 @@ CASE_G_ENERGY = 0
 CASE_G_MULTIPLICITY = 0
 CASE_G_PHASE_SHIFT = 0
 
-# Subsets main dictionary for values with "_1" in the key
-# Note: Case G doesn't take into account metal dihedrals which should be zero
-# Instead metal dihedrals will just be missing from LAMMPS files
-caseGDictionary = {key: value for key, value in possibleAtoms.items() if "_1" in key}
-
-for key, value in caseGDictionary.items():
-
-    # Writes to files, calculate barrier energy and add key combo to list
-    file_type.write("@dihedral:" + key.replace("*", "w") + "-wildcard" + "  @atom:* @atom:" + key + " @atom:*" + " @atom:*\n")
-    file_coeff.write("dihedral_coeff @dihedral:" + key.replace("*", "w") + "-wildcard " + str(CASE_G_ENERGY) + " " + str(CASE_G_MULTIPLICITY) + " " + str(CASE_G_PHASE_SHIFT) + " 0.000\n")
-    typeNames.append(key.replace("*", "w") + "-wildcard")
-
 # Case H - J,K = X_3 from column 16
 # Alternate form of Case A
 CASE_H_ENERGY = 2.0/2
 CASE_H_MULTIPLICITY = 2
 CASE_H_PHASE_SHIFT = 90 * CASE_H_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_3" in the key if they are column16
-caseHDictionary = {key: value for key, value in possibleAtoms.items() for x3 in column16 if x3 in key}
-
-for keyJ, valueJ in caseHDictionary.items():
-    for keyK, valueK in caseHDictionary.items():
-
-        writeOutput(CASE_H_ENERGY, CASE_H_MULTIPLICITY, CASE_H_PHASE_SHIFT, keyJ, keyK)
-
 # Case I - J = X_3 from column 16, K = X_2, X_R
 # Alternate form of Case B
 CASE_I_ENERGY = 2.0/2
 CASE_I_MULTIPLICITY = 2
 CASE_I_PHASE_SHIFT = 180 * CASE_I_MULTIPLICITY + 180
 
-# Subsets main dictionary for values with "_3" for column16, "_2" or "_R" in the key
-# C_R_b1 can't techically ever do this but has been left
-caseIDictionaryJ = {key: value for key, value in possibleAtoms.items() for x3 in column16 if x3 in key}
-caseIDictionaryK = {key: value for key, value in possibleAtoms.items() if "_2" in key or "_R" in key}
-wildcardCases(["C_2", "C_2_b1", "C_2_b2"], "C_2*", caseIDictionaryK)
-wildcardCases(["C_R*", "C_R*_b1"], "C_R*", caseIDictionaryK)
-wildcardCases(["B_2_d1", "B_2_b1_d1", "B_2_b2_d1"], "B_2*_d1", caseIDictionaryK)
-wildcardCases(["B_2_d2", "B_2_b1_d2", "B_2_b2_d2"], "B_2*_d2", caseIDictionaryK)
-wildcardCases(["N_R_d2*", "N_R_b1_d2*"], "N_R*_d2*", caseIDictionaryK)
-wildcardCases(["N_2_d1*", "N_2_b1_d1*", "N_2_b2_d1*"], "N_2*_d1*", caseIDictionaryK)
-wildcardCases(["N_2_d2*", "N_2_b1_d2*", "N_2_b2_d2*"], "N_2*_d2*", caseIDictionaryK)
-wildcardCases(["O_2", "O_2_ha", "O_2_b1*", "O_2_b2*"], "O_2*", caseIDictionaryK)
-
-for keyJ, valueJ in caseIDictionaryJ.items():
-    for keyK, valueK in caseIDictionaryK.items():
-
-        writeOutput(CASE_I_ENERGY, CASE_I_MULTIPLICITY, CASE_I_PHASE_SHIFT, keyJ, keyK)
-
 # Case J - J= X_2, X_R, K = X_3, I != X_2, X_R e.g. propene
 # Alternate form of Case B - Last means it has greatest priority in moltemplate
 CASE_J_ENERGY = 2.0/2
 CASE_J_MULTIPLICITY = 3
 CASE_J_PHASE_SHIFT = 180 * CASE_J_MULTIPLICITY + 180
 
-caseJDictionaryJ = {key: value for key, value in possibleAtoms.items() if "_2" in key or "_R" in key}
-wildcardCases(["C_2", "C_2_b1", "C_2_b2"], "C_2*", caseJDictionaryJ)
-wildcardCases(["C_R*", "C_R*_b1"], "C_R*", caseJDictionaryJ)
-wildcardCases(["B_2_d1", "B_2_b1_d1", "B_2_b2_d1"], "B_2*_d1", caseJDictionaryJ)
-wildcardCases(["B_2_d2", "B_2_b1_d2", "B_2_b2_d2"], "B_2*_d2", caseJDictionaryJ)
-wildcardCases(["N_R_d2*", "N_R_b1_d2*"], "N_R*_d2*", caseJDictionaryJ)
-wildcardCases(["N_2_d1*", "N_2_b1_d1*", "N_2_b2_d1*"], "N_2*_d1*", caseJDictionaryJ)
-wildcardCases(["N_2_d2*", "N_2_b1_d2*", "N_2_b2_d2*"], "N_2*_d2*", caseJDictionaryJ)
-wildcardCases(["O_2", "O_2_ha", "O_2_b1*", "O_2_b2*"], "O_2*", caseJDictionaryJ)
-
-caseJDictionaryK = {key: value for key, value in possibleAtoms.items() if "_3" in key}
-caseJDictionaryI = {key: value for key, value in possibleAtoms.items() if "_2" not in key and "_R" not in key}
+# Dihedral case table, in the order the rules are written. J, K and I are the
+# (label set, predicate) of each atom, where predicates take the attribute
+# masks of the label set. pair removes J-K combinations. Cases with only J are
+# written as X-J-X-X wildcards with the coefficients as given.
+caseTable = [
+    # Subpriority with Case H - skips column16-column16 bonding pairs
+    {"case": "A", "energy": CASE_A_ENERGY,
+     "multiplicity": CASE_A_MULTIPLICITY, "phaseShift": CASE_A_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.SP3)),
+     "K": ("all", lambda a: allFlags(a, ld.SP3)),
+     "pair": lambda aJ, aK: ~(aJ["Column16"][:, None] & aK["Column16"][None, :])},
+
+    # Due to Case I priority K skips column16 - Case J given priority by MT
+    # rather than here. Only O_3* and S_3 are skipped: this reproduces the old
+    # exact-string exclusion list ["O_3*", "S_3", "Se_3", "Te_3"], which no
+    # label matched for Se and Te as theirs all have d flags. It is not a
+    # chemical rule, so Se_3_dN and Te_3_dN labels are still in K.
+    {"case": "B", "energy": CASE_B_ENERGY,
+     "multiplicity": CASE_B_MULTIPLICITY, "phaseShift": CASE_B_PHASE_SHIFT,
+     "J": ("sp2", lambda a: anyFlag(a, ld.SP2 | ld.RESONANT)),
+     "K": ("all", lambda a: allFlags(a, ld.SP3) & ~(a["Column16"] & (a["D"] == 0)))},
+
+    # K has no _b1 and "notb2"-b2 bonds, which are single bonds, are removed
+    {"case": "C", "energy": CASE_C_ENERGY,
+     "multiplicity": CASE_C_MULTIPLICITY, "phaseShift": CASE_C_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.SP2)),
+     "K": ("all", lambda a: allFlags(a, ld.SP2) & ~anyFlag(a, ld.B1)),
+     "pair": lambda aJ, aK: anyFlag(aJ, ld.B2)[:, None] == anyFlag(aK, ld.B2)[None, :]},
+
+    {"case": "D", "energy": CASE_D_ENERGY,
+     "multiplicity": CASE_D_MULTIPLICITY, "phaseShift": CASE_D_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.RESONANT)),
+     "K": ("all", lambda a: allFlags(a, ld.RESONANT) & ~anyFlag(a, ld.B1))},
+
+    # Case E is split into thirds due to complexity added with the b2 flag
+    # b1-b1 bond pairs, apart from R_b1-R_b1 which is Case F
+    {"case": "E", "energy": CASE_E_ENERGY,
+     "multiplicity": CASE_E_MULTIPLICITY, "phaseShift": CASE_E_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.B1) & anyFlag(a, ld.SP2 | ld.RESONANT)),
+     "K": ("all", lambda a: allFlags(a, ld.SP2 | ld.B1))},
+
+    # b2-notb2 bonds - all bonds for b2 atoms are single bonds unless both
+    # atoms have the b2 flag
+    {"case": "E", "energy": CASE_E_ENERGY,
+     "multiplicity": CASE_E_MULTIPLICITY, "phaseShift": CASE_E_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.B2)),
+     "K": ("all", lambda a: allFlags(a, ld.SP2) & ~anyFlag(a, ld.B2))},
+
+    # Dihedrals between X_R and X_2
+    {"case": "E", "energy": CASE_E_ENERGY,
+     "multiplicity": CASE_E_MULTIPLICITY, "phaseShift": CASE_E_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.RESONANT) & ~anyFlag(a, ld.B1)),
+     "K": ("all", lambda a: allFlags(a, ld.SP2))},
+
+    # R_b1-R_b1 bonds
+    {"case": "F", "energy": CASE_F_ENERGY,
+     "multiplicity": CASE_F_MULTIPLICITY, "phaseShift": CASE_F_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.RESONANT | ld.B1)),
+     "K": ("all", lambda a: allFlags(a, ld.RESONANT | ld.B1))},
+
+    # Note: Case G doesn't take into account metal dihedrals which should be zero
+    # Instead metal dihedrals will just be missing from LAMMPS files
+    {"case": "G", "energy": CASE_G_ENERGY,
+     "multiplicity": CASE_G_MULTIPLICITY, "phaseShift": CASE_G_PHASE_SHIFT,
+     "J": ("all", lambda a: allFlags(a, ld.SP1))},
+
+    {"case": "H", "energy": CASE_H_ENERGY,
+     "multiplicity": CASE_H_MULTIPLICITY, "phaseShift": CASE_H_PHASE_SHIFT,
+     "J": ("all", lambda a: a["Column16"]),
+     "K": ("all", lambda a: a["Column16"])},
+
+    # C_R_b1 can't techically ever do this but has been left
+    {"case": "I", "energy": CASE_I_ENERGY,
+     "multiplicity": CASE_I_MULTIPLICITY, "phaseShift": CASE_I_PHASE_SHIFT,
+     "J": ("all", lambda a: a["Column16"]),
+     "K": ("sp2", lambda a: anyFlag(a, ld.SP2 | ld.RESONANT))},
+
+    # The only case to use the I atom
+    {"case": "J", "energy": CASE_J_ENERGY,
+     "multiplicity": CASE_J_MULTIPLICITY, "phaseShift": CASE_J_PHASE_SHIFT,
+     "J": ("sp2", lambda a: anyFlag(a, ld.SP2 | ld.RESONANT)),
+     "K": ("all", lambda a: allFlags(a, ld.SP3)),
+     "I": ("all", lambda a: ~anyFlag(a, ld.SP2 | ld.RESONANT))},
+]
+
+# Evaluate a case table entry for every combination of its J, K (and I) labels
+# at once. Returns a list of (dihedral name, atom patterns, coeff) rules in the
+# order J, then K, then I.
+def evaluateCase(entry):
+    roles = [role for role in ["J", "K", "I"] if role in entry]
+    roleNames = []
+    roleValues = []
+    roleAttributes = []
+    for role in roles:
+        setName, predicate = entry[role]
+        setNames, setValues, attributes = labelSets[setName]
+        mask = predicate(attributes)
+        roleNames.append(setNames[mask])
+        roleValues.append(setValues[mask])
+        roleAttributes.append({flag: values[mask] for flag, values in attributes.items()})
+
+    coeffEnd = " " + str(entry["multiplicity"]) + " " + str(entry["phaseShift"]) + " 0.000"
+
+    # Single atom cases have no barrier energy calculation
+    if len(roles) == 1:
+        names = np.char.add(np.char.replace(roleNames[0], "*", "w"), "-wildcard")
+        patterns = [("*", keyJ, "*", "*") for keyJ in roleNames[0].tolist()]
+        return list(zip(names.tolist(), patterns, [str(entry["energy"]) + coeffEnd] * len(patterns)))
+
+    # Every combination, with pairs removed
+    combinations = np.ones([len(names) for names in roleNames], dtype=bool)
+    if "pair" in entry:
+        combinations &= entry["pair"](roleAttributes[0], roleAttributes[1])
+    indices = np.nonzero(combinations)
+    labelsJ, labelsK = roleNames[0][indices[0]], roleNames[1][indices[1]]
+
+    # Barrier energy is shared between the possible bonds of J and K
+    bondProducts = roleValues[0][indices[0]] * roleValues[1][indices[1]]
+    products, productIndex = np.unique(bondProducts, return_inverse=True)
+    barrierEnergies = np.array([str(round(entry["energy"] / product, 4)) for product in products.tolist()])
+    coeffs = np.char.add(barrierEnergies[productIndex.reshape(-1)], coeffEnd)
+
+    # Type names are J-K, or I-J-K with I first, with the wildcard * as w
+    if len(roles) == 2:
+        nameLabels = [labelsJ, labelsK]
+        patterns = [("*", keyJ, keyK, "*") for keyJ, keyK in zip(labelsJ.tolist(), labelsK.tolist())]
+    else:
+        labelsI = roleNames[2][indices[2]]
+        nameLabels = [labelsI, labelsJ, labelsK]
+        patterns = [(keyI, keyJ, keyK, "*")
+                    for keyI, keyJ, keyK in zip(labelsI.tolist(), labelsJ.tolist(), labelsK.tolist())]
+    names = nameLabels[0]
+    for nameLabel in nameLabels[1:]:
+        names = np.char.add(np.char.add(names, "-"), nameLabel)
+    names = np.char.replace(names, "*", "w")
+
+    return list(zip(names.tolist(), patterns, coeffs.tolist()))
+
+# Write the rules of a case to the dihedral by type and coeff files. Names
+# are checked as they are added, as no type name should appear twice
+def writeCase(case, rules):
+    for dihedralName, patterns, coeff in rules:
+        if dihedralName in typeNames:
+            raise Exception("Repeated type name " + dihedralName + " from Case "
+                            + typeNames[dihedralName] + " and Case " + case + ".")
+        typeNames[dihedralName] = case
+        file_type.write("@dihedral:" + dihedralName + " @atom:" + " @atom:".join(patterns) + "\n")
+        file_coeff.write("dihedral_coeff @dihedral:" + dihedralName + " " + coeff + "\n")
+
+# Case of each written type name: No type names should appear twice with this methodology
+typeNames = {}
+
+# Rules of each case in the order they are written: case - [(name, patterns, coeff)]
+caseRules = {}
+for entry in caseTable:
+    caseRules.setdefault(entry["case"], []).extend(evaluateCase(entry))
+
+# Mask cache is shared so that label patterns are only matched once
+maskCache = {}
+ruleNames = set()
+writeRules = []
+for case, rules in caseRules.items():
+    # Case G is already written with wildcards
+    if COMPACT_RULES and case != "G":
+        originalNames = {(patterns, coeff): dihedralName for dihedralName, patterns, coeff in rules}
+        compactRules = dr.compactDihedrals([(patterns, coeff) for dihedralName, patterns, coeff in rules], labels, maskCache)
+
+        # Keep original names, otherwise name compacted rules as I-J-K (I dropped if *)
+        rules = []
+        for patterns, coeff in compactRules:
+            dihedralName = originalNames.get((patterns, coeff))
+            if dihedralName is None:
+                namePatterns = patterns[1:3] if patterns[0] == "*" else patterns[:3]
+                dihedralName = '-'.join(namePatterns).replace("*", "w")
+                if dihedralName in ruleNames:
+                    dihedralName += "-case" + case
+            rules.append((dihedralName, patterns, coeff))
+
+    ruleNames.update(dihedralName for dihedralName, patterns, coeff in rules)
+    writeRules.append((case, rules))
+
+# Compaction only works within a case, so compacted rules that later cases
+# override for every label they match are dropped
+if COMPACT_RULES:
+    reachable = dr.reachableRules([(dihedralName, patterns) for case, rules in writeRules for dihedralName, patterns, coeff in rules],
+                                  "dihedral", labels, maskCache)
+    ruleIndex = 0
+    for position, (case, rules) in enumerate(writeRules):
+        writeRules[position] = (case, [rule for index, rule in enumerate(rules, ruleIndex) if index in reachable])
+        ruleIndex += len(rules)
 
-for keyJ, valueJ in caseJDictionaryJ.items():
-    for keyK, valueK in caseJDictionaryK.items():
-        for keyI, valueI in caseJDictionaryI.items():
+# Start dihedral by type and coeff files
+file_type = open("dihedralType.txt", "w")
+file_coeff = open("dihedralCoeff.txt", "w")
 
-            writeOutput(CASE_J_ENERGY, CASE_J_MULTIPLICITY, CASE_J_PHASE_SHIFT, keyJ, keyK, keyI)
+for case, rules in writeRules:
+    writeCase(case, rules)
 
 file_type.close()
 file_coeff.close()
-
-# Find repeated type names
-repeatNames = set([x for x in typeNames if typeNames.count(x) > 1])
-# Raises error if names are repeated
-if len(repeatNames) != 0:
-    raise Exception("Repeated type names exist in this file.")
@@ -1,6 +1,6 @@
 ##############################################################################
 # Developed by: Matthew Bone
-# Last Updated: 04/05/2021
+# Last Updated: 18/10/2026
 # Updated by: Matthew Bone
 #
 # Contact Details:
@@ -18,8 +18,17 @@
 # legacy. The second wave additions are the inclusion of all other atoms apart
 # from H, C, O and N. New labels can be added by copying the format and
 # recompiling the force field.
+#
+# labelTable stores the same data as numpy columns, one row per label, with
+# each label's flags parsed once into a bitmask (SP1, B1, DONOR etc.), so the
+# generators can select classes of labels with bit operations rather than
+# substring tests. labelColumns parses any list of labels, including the
+# wildcard (*) labels the generators make, e.g. "C_R*_b1".
 ##############################################################################
 
+# Import packages
+import numpy as np
+
 # Dictionary of all possible labels
 # Index [0] - mass; [1] - bond data (R0); [2] - nonbond LJ where [2][0] is
 # R0 and [2][1] is D0; [3] - dihedral data (number of possible bonds)
@@ -137,3 +146,87 @@ labelDict= {
     "O_1_ha": [15.999, 0.528, [3.033153, 0.0957], 0],
     "F_ha": [18.998, 0.611, [3.093200, 0.0725], 0],
 }
+
+# Label flag bits
+SP1 = 1         # X_1
+SP2 = 2         # X_2
+SP3 = 4         # X_3, including C_31 to C_34
+RESONANT = 8    # X_R, including C_R1
+B1 = 16         # _b1
+B2 = 32         # _b2
+DONOR = 64      # _hd
+ACCEPTOR = 128  # _ha
+
+# Flag bits of each hybridisation and flag in a label
+hybridFlags = {"1": SP1, "2": SP2, "3": SP3, "R": RESONANT}
+labelFlagBits = {"b1": B1, "b2": B2, "hd": DONOR, "ha": ACCEPTOR}
+
+# Elements of column 16 (oxygen, sulphur, etc.)
+COLUMN16_ELEMENTS = ["O", "S", "Se", "Te"]
+
+# Parse a label, e.g. "N_R_b1_d2_hd", into its element, flag bits and d flag
+# (0 if none). Wildcards (*) are ignored.
+def parseLabel(label):
+    parts = label.replace("*", "").split("_")
+    flags = 0
+    dFlag = 0
+    for position, part in enumerate(parts[1:]):
+        if position == 0 and part[:1] in hybridFlags:
+            flags |= hybridFlags[part[0]]
+        elif part in labelFlagBits:
+            flags |= labelFlagBits[part]
+        elif part[:1] == "d" and part[1:].isdigit():
+            dFlag = int(part[1:])
+
+    return parts[0], flags, dFlag
+
+# Return the element, flag bits and d flag columns of a list of labels
+def labelColumns(labels):
+    elements, flags, dFlags = zip(*[parseLabel(label) for label in labels]) if len(labels) > 0 else ((), (), ())
+    columns = {
+        "Label": np.array(labels, dtype=str),
+        "Element": np.array(elements, dtype=str),
+        "Flags": np.array(flags, dtype=np.int64),
+        "D": np.array(dFlags, dtype=np.int64),
+    }
+
+    return columns
+
+# Return the bond order DREIDING gives bonds between labels with flag bits
+# flagsI and flagsJ (arrays). The first true condition is used, with b1/b2
+# flags handled first for higher priority.
+def labelBondOrders(flagsI, flagsJ):
+    def both(bit):
+        return ((flagsI & bit) != 0) & ((flagsJ & bit) != 0)
+
+    orders = np.select(
+        [
+            # Catch X_b1-x_b1 bonds
+            both(B1),
+            # Catch X_2_b2-X_2_b2 bonds where bond order is 2
+            both(B2),
+            # Catch X_2_b2-X_2 bonds where bond order is 1
+            (((flagsI & B2) != 0) & ((flagsJ & SP2) != 0)) | (((flagsI & SP2) != 0) & ((flagsJ & B2) != 0)),
+            # Catch X_1-X_1 bonds where the bond order will always be 3
+            both(SP1),
+            # Catch X_2-X_2 bonds where the bond order will always be 2
+            both(SP2),
+            # Catch X_R-X_R bonds where the bond order will always be 1.5
+            both(RESONANT),
+        ],
+        [1, 2, 1, 3, 2, 1.5],
+        # If not a specialist case, the bond is single
+        default = 1
+    )
+
+    return orders
+
+# Label table - the label dictionary as columns, with labels numbered in order
+labelTable = labelColumns(list(labelDict.keys()))
+labelTable["ID"] = np.arange(len(labelDict))
+labelTable["Mass"] = np.array([value[0] for value in labelDict.values()])
+labelTable["Radius"] = np.array([value[1] for value in labelDict.values()])
+labelTable["LJ R"] = np.array([value[2][0] for value in labelDict.values()])
+labelTable["LJ D"] = np.array([value[2][1] for value in labelDict.values()])
+labelTable["Bonds"] = np.array([value[3] for value in labelDict.values()], dtype=np.int64)
+labelIDs = {label: number for number, label in enumerate(labelDict)}
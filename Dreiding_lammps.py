@@ -0,0 +1,161 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to write a labelled system straight to LAMMPS
+# input files, without using moltemplate. The force field parameters are
+# taken from the compiled force field (dreiding.lt) that the Dreiding_*.py
+# scripts generate, and every interaction is typed with the lookup index in
+# Dreiding_rules.py.
+#
+# Three files are written: 'name'.data for read_data in the LAMMPS 'full' atom
+# style, 'name'.in.init with the force field styles and 'name'.in.settings
+# with every pair, bond, angle, dihedral and improper coefficient. Atom types
+# are numbered in the order of the force field masses and other types in the
+# order of their By Type rules.
+##############################################################################
+
+# Import packages
+import numpy as np
+import Dreiding_rules as dr
+from fnmatch import fnmatchcase
+
+# Section names for each interaction in the data file
+dataSections = {"bond": "Bonds", "angle": "Angles", "dihedral": "Dihedrals", "improper": "Impropers"}
+
+# Return a dictionary of label - mass from the force field masses
+def readMasses(ffLines):
+    masses = {}
+    for line in dr.readBlock(ffLines, "Data Masses"):
+        words = line.split()
+        if len(words) == 2 and words[0].startswith("@atom:"):
+            masses[words[0].split(":", 1)[1]] = words[1]
+
+    return masses
+
+# Number the labels and interaction types used by a system starting from 1
+def typeNumbers(ffLines, masses, labels, typedTopology):
+    usedLabels = set(labels)
+    atomTypes = {label: number + 1 for number, label in enumerate(label for label in masses if label in usedLabels)}
+    assert(len(atomTypes) == len(usedLabels)), "Labels missing from the force field masses: {}".format(usedLabels.difference(masses))
+
+    interactionTypes = {}
+    for interaction in dr.interactions:
+        usedTypes = set(typedTopology[interaction][1])
+        ruleNames = dict.fromkeys(name for name, patterns in dr.readRules(ffLines, interaction) if name in usedTypes)
+        interactionTypes[interaction] = {name: number + 1 for number, name in enumerate(ruleNames)}
+
+    return atomTypes, interactionTypes
+
+# Write the read_data file. box is [[xlo, xhi], [ylo, yhi], [zlo, zhi]].
+def writeData(filename, atomTypes, interactionTypes, masses, labels, molIDs, charges, coords, typedTopology, box):
+    nAtoms = len(labels)
+    atomTypeIDs = np.array([atomTypes[label] for label in labels])
+
+    with open(filename, 'w') as file:
+        file.write("LAMMPS data file written without moltemplate\n\n")
+
+        # Header counts
+        file.write(str(nAtoms) + " atoms\n")
+        for interaction in dr.interactions:
+            file.write(str(len(typedTopology[interaction][0])) + " " + interaction + "s\n")
+        file.write("\n" + str(len(atomTypes)) + " atom types\n")
+        for interaction in dr.interactions:
+            file.write(str(len(interactionTypes[interaction])) + " " + interaction + " types\n")
+
+        # Box
+        file.write("\n")
+        for (lo, hi), dimension in zip(box, ["x", "y", "z"]):
+            file.write(str(lo) + " " + str(hi) + " " + dimension + "lo " + dimension + "hi\n")
+
+        # Masses
+        file.write("\nMasses\n\n")
+        file.write("".join(str(number) + " " + masses[label] + " # " + label + "\n" for label, number in atomTypes.items()))
+
+        # Atoms - id mol type charge x y z
+        file.write("\nAtoms # full\n\n")
+        atomTable = np.column_stack((np.arange(1, nAtoms + 1), molIDs, atomTypeIDs, charges, coords))
+        np.savetxt(file, atomTable, fmt='%d %d %d %f %f %f %f')
+
+        # Bonds, angles, dihedrals and impropers - id type atoms
+        for interaction in dr.interactions:
+            atoms, types = typedTopology[interaction]
+            if len(atoms) == 0:
+                continue
+            typeIDs = np.array([interactionTypes[interaction][name] for name in types])
+            file.write("\n" + dataSections[interaction] + "\n\n")
+            table = np.column_stack((np.arange(1, len(atoms) + 1), typeIDs, atoms + 1))
+            np.savetxt(file, table, fmt='%d')
+
+# Write the settings file with every coefficient for the numbered types.
+# Wildcard pair_coeff lines are expanded to each matching pair of atom types
+# in file order, so later lines take priority as they do in moltemplate. Pairs
+# without a pair_coeff line are left to LAMMPS mixing (pair_modify).
+def writeSettings(filename, ffLines, atomTypes, interactionTypes):
+    labels = list(atomTypes.keys())
+
+    with open(filename, 'w') as file:
+        # pair_modify lines (e.g. mixing rules) are kept as they are
+        file.writelines(line.strip() + "\n" for line in dr.readBlock(ffLines, "In Settings") if line.split()[:1] == ["pair_modify"])
+
+        for (patternI, patternJ), words in dr.readPairCoeffs(ffLines):
+            # Atom labels used as coefficients must be in the system
+            coeffLabels = [word.split(":", 1)[1] for word in words if word.startswith("@atom:")]
+            if any(label not in atomTypes for label in coeffLabels):
+                continue
+            coeffs = " ".join(str(atomTypes[word.split(":", 1)[1]]) if word.startswith("@atom:") else word for word in words)
+
+            for x, labelI in enumerate(labels):
+                for labelJ in labels[x:]:
+                    if (fnmatchcase(labelI, patternI) and fnmatchcase(labelJ, patternJ)) or (fnmatchcase(labelJ, patternI) and fnmatchcase(labelI, patternJ)):
+                        file.write("pair_coeff " + str(atomTypes[labelI]) + " " + str(atomTypes[labelJ]) + " " + coeffs + "\n")
+
+        for interaction in dr.interactions:
+            coeffs = dr.readCoeffs(ffLines, interaction)
+            file.write("\n")
+            for name, number in interactionTypes[interaction].items():
+                file.write(interaction + "_coeff " + str(number) + " " + coeffs[name] + " # " + name + "\n")
+
+# Read the force field and build its lookup index once, so that many systems
+# can be written with the same force field
+def loadForceField(filename):
+    ffLines = dr.readForceField(filename)
+    forcefield = {
+        "Lines": ffLines,
+        "Index": dr.buildIndex(ffLines),
+        "Masses": readMasses(ffLines),
+    }
+
+    return forcefield
+
+# Type a labelled system and write 'name'.data, 'name'.in.init and 'name'.in.settings.
+# forcefield is a force field file or the output of loadForceField. bonds is an
+# array of atom index pairs and box is [[xlo, xhi], [ylo, yhi], [zlo, zhi]].
+def writeLammps(name, forcefield, labels, charges, coords, bonds, box, molIDs=None):
+    if isinstance(forcefield, str):
+        forcefield = loadForceField(forcefield)
+    ffLines = forcefield["Lines"]
+    masses = forcefield["Masses"]
+
+    typedTopology = dr.typeTopology(forcefield["Index"], labels, bonds)
+    atomTypes, interactionTypes = typeNumbers(ffLines, masses, labels, typedTopology)
+
+    if molIDs is None:
+        molIDs = np.ones(len(labels), dtype=np.int64)
+
+    writeData(name + ".data", atomTypes, interactionTypes, masses, labels, molIDs, charges, coords, typedTopology, box)
+
+    with open(name + ".in.init", 'w') as file:
+        file.writelines(line.strip() + "\n" for line in dr.readBlock(ffLines, "In Init") if not line.strip().startswith("}"))
+
+    writeSettings(name + ".in.settings", ffLines, atomTypes, interactionTypes)
@@ -1,6 +1,6 @@
 ##############################################################################
 # Developed by: Matthew Bone
-# Last Updated: 01/10/2020
+# Last Updated: 18/10/2026
 # Updated by: Matthew Bone
 #
 # Contact Details:
@@ -17,14 +17,25 @@
 # coefficients, this script uses an atomDictionary rather than the
 # Dreiding_label_dictionary. All R values are the original DREIDING value
 # divided by 2^1/6 as LAMMPS requires R at the zero crossing point.
+#
+# Cross terms are the arithmetic mean of R and the geometric mean of D, which
+# is LAMMPS' arithmetic mixing rule. When MIXING_RULES is True only the
+# diagonal pair_coeff lines are written, with pair_modify mix arithmetic, so
+# the force field and in.settings are much shorter. LAMMPS won't mix a type
+# that has more than one hybrid/overlay sub-style, so cross terms of labels
+# that can be hydrogen bond donors (hbond/dreiding/lj) are still written.
 ##############################################################################
 # Import packages
 import os
-import pandas as pd
 import numpy as np
+from fnmatch import fnmatchcase
+import Dreiding_label_dictionary as ld
 
 os.chdir("/home/matt/Documents/Dreiding_forcefield")
 
+# Write only the diagonal pair_coeff lines and let LAMMPS mix the cross terms
+MIXING_RULES = False
+
 # [0] is R, [1] is D
 atomDictionary = {
     "H": [2.846421, 0.0152],
@@ -63,48 +74,28 @@ atomDictionary = {
 }
 
 # List of keys from dictionary
-keys = list(atomDictionary.keys())
-
-# Empty dataframe for Rij with rows and columns labelled as keys
-Rij = pd.DataFrame([], index = [keys], columns = [keys])
-
-# Rij calculation from DREIDING
-for i in range(len(atomDictionary)):
-    for j in range(len(atomDictionary)):
-        Rij.loc[keys[i],keys[j]] = (atomDictionary[keys[i]][0] + atomDictionary[keys[j]][0]) / 2
-
-# Convert to numpy matrix so that values below the diagonal can be found
-Rij = Rij.to_numpy()
-Rij = Rij.astype('float64')
-Rij = np.asmatrix(Rij)
-Rij = np.tril(Rij)
-Rij = np.around(Rij, decimals = 8)
-Rij
-
-# Empty dataframe for Dij with rows and columns labelled as keys
-Dij = pd.DataFrame([], index = [keys], columns = [keys])
-
-# Dij calculation from DREIDING
-for i in range(len(atomDictionary)):
-    for j in range(len(atomDictionary)):
-        Dij.loc[keys[i],keys[j]] = (atomDictionary[keys[i]][1] * atomDictionary[keys[j]][1])**0.5
+keys = np.array(list(atomDictionary.keys()))
 
-# Convert to numpy matrix so that values below the diagonal can be found
-Dij = Dij.to_numpy()
-Dij = Dij.astype('float64')
-Dij = np.asmatrix(Dij)
-Dij = np.tril(Dij)
-Dij = np.around(Dij, decimals = 8)
-Dij
+# Rij (arithmetic mean) and Dij (geometric mean) calculation from DREIDING for
+# every pair, keeping values on and below the diagonal
+R = np.array([value[0] for value in atomDictionary.values()])
+D = np.array([value[1] for value in atomDictionary.values()])
+Rij = np.around((R[:, None] + R[None, :]) / 2, decimals = 8)
+Dij = np.around((D[:, None] * D[None, :])**0.5, decimals = 8)
+rows, columns = np.tril_indices(len(keys))
 
-# Create text file
-file = open("lj_nonbond.txt", "w")
+# With mixing rules only the diagonal and hydrogen bond donor cross terms are written
+if MIXING_RULES:
+    donorLabels = ld.labelTable["Label"][(ld.labelTable["Flags"] & ld.DONOR) != 0].tolist()
+    donors = np.array([any(fnmatchcase(label, key) for label in donorLabels) for key in keys])
+    written = (rows == columns) | donors[rows] | donors[columns]
+    rows, columns = rows[written], columns[written]
 
 # Write lines of text file using wildcards for C, N and O; not H and H_HB
-for i in range(len(atomDictionary)):
-    for j in range(len(atomDictionary)):
-        if Rij[i,j] == 0:
-            continue
-        file.write("pair_coeff  @atom:" + keys[i] + "  @atom:" + keys[j] + " lj/cut/coul/long " + str(Dij[i,j]) + " " + str(Rij[i,j]) + "\n")
+lines = ["pair_coeff  @atom:" + keyI + "  @atom:" + keyJ + " lj/cut/coul/long " + str(d) + " " + str(r) + "\n"
+         for keyI, keyJ, d, r in zip(keys[rows].tolist(), keys[columns].tolist(), Dij[rows, columns].tolist(), Rij[rows, columns].tolist())]
+if MIXING_RULES:
+    lines.insert(0, "pair_modify pair lj/cut/coul/long mix arithmetic\n")
 
-file.close()
+with open("lj_nonbond.txt", "w") as file:
+    file.write("".join(lines))
@@ -0,0 +1,51 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file writes a trimmed copy of the force field that only contains the
+# masses, pair_coeff, bond, angle, dihedral and improper rules that can match
+# the atom labels used by a system. Moltemplate has to check every By Type rule
+# for every interaction it builds, so a system that only uses a handful of
+# labels is built much faster from the trimmed file. Rules are filtered without
+# being reordered, which keeps the last-match priority of the full force field
+# (e.g. Case I and Case J dihedrals remain at the bottom).
+#
+# Argument 1 is the full force field file e.g. 'dreiding.lt'. Argument 2 is the
+# trimmed force field file to write e.g. 'dreiding_pruned.lt'. All following
+# arguments are molecule .lt files that use the force field, typically the
+# labelled output of xyzToMoltemplate e.g. 'methanol.lt'. The molecule files
+# should then import the trimmed file instead of the full force field.
+#
+# This file requires the library Dreiding_rules.py
+##############################################################################
+
+# Import packages
+import sys
+import Dreiding_rules as dr
+
+forcefield = sys.argv[1]
+outputFile = sys.argv[2]
+moleculeFiles = sys.argv[3:]
+
+# Find the atom labels used by the system
+labels = dr.labelsFromLT(moleculeFiles)
+assert(len(labels) != 0), "No @atom: labels found in: {}".format(moleculeFiles)
+
+# Read force field and drop the rules that can't match the system
+ffLines = dr.readForceField(forcefield)
+prunedLines = dr.pruneForceField(ffLines, labels)
+
+with open(outputFile, 'w') as file:
+    file.writelines(prunedLines)
+
+print("Kept " + str(len(prunedLines)) + " of " + str(len(ffLines)) + " lines for labels: " + " ".join(sorted(labels)))
@@ -0,0 +1,204 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to find the rings of a bond graph (e.g. from
+# bondCalculation in xyzFunctions.py) and the aromatic rings among them, which
+# take the resonance labels (C_R, N_R, O_R) in Dreiding_typing.py.
+#
+# Only rings of up to MAX_RING_SIZE atoms are found. Atoms that can't be in a
+# ring (chains and hydrogens) are removed first, then every ring is found by
+# growing paths from the lowest atom of the ring as batched numpy operations.
+# On cross-linked networks the paths only branch at ring and cross-link atoms,
+# so the work grows linearly with the number of atoms. The smallest set of
+# smallest rings (SSSR) is picked from these rings, smallest first, keeping
+# each ring whose bonds are independent of the rings already kept. Larger
+# rings, e.g. the loops of a cross-linked network, aren't needed for
+# aromaticity and are not included.
+#
+# This file requires the library Dreiding_rules.py
+##############################################################################
+
+# Import packages
+import numpy as np
+import Dreiding_rules as dr
+
+# Largest ring found. Aromatic rings have 5 to 7 atoms.
+MAX_RING_SIZE = 7
+
+# Largest RMS distance (angstroms) of ring atoms from their best fit plane for
+# a planar ring
+PLANAR_RMS = 0.1
+
+# Number of paths started together when growing rings
+PATH_BATCH = 2000
+
+# Return a boolean mask of the atoms in the 2-core of the graph, the atoms left
+# after repeatedly removing atoms with less than two neighbours
+def twoCore(indptr, neighbours):
+    degree = np.diff(indptr)
+    inCore = np.ones(len(degree), dtype=bool)
+
+    removing = list(np.flatnonzero(degree < 2))
+    inCore[removing] = False
+    while len(removing) > 0:
+        atom = removing.pop()
+        for other in neighbours[indptr[atom]:indptr[atom + 1]]:
+            degree[other] -= 1
+            if inCore[other] and degree[other] < 2:
+                inCore[other] = False
+                removing.append(other)
+
+    return inCore
+
+# Find every ring of up to maxSize atoms. Paths start at each atom and only
+# grow through higher atoms, so each ring is grown from its lowest atom, and
+# is found in both directions, of which the one with the lower second atom is
+# kept. Returns a list of (rings, size) arrays of atom indices in ring order.
+def allRings(nAtoms, bonds, maxSize=MAX_RING_SIZE):
+    indptr, neighbours, bondIDs = dr.adjacency(nAtoms, bonds)
+    inCore = twoCore(indptr, neighbours)
+
+    # Only keep bonds between atoms in the core
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    bonds = bonds[inCore[bonds].all(axis=1)]
+    indptr, neighbours, bondIDs = dr.adjacency(nAtoms, bonds)
+    degree = np.diff(indptr)
+
+    # Paths of two atoms from the lower atom of each bond, grown in batches so
+    # that memory doesn't grow with the size of the system
+    startPaths = np.sort(bonds, axis=1)
+    rings = {}
+    for batch in range(0, len(startPaths), PATH_BATCH):
+        growRings(startPaths[batch:batch + PATH_BATCH], indptr, neighbours, degree, maxSize, rings)
+
+    return [(np.concatenate(rings[size]), size) for size in sorted(rings)]
+
+# Grow paths into rings of up to maxSize atoms, adding the rings of each size
+# to the rings dictionary of size - list of ring arrays
+def growRings(paths, indptr, neighbours, degree, maxSize, rings):
+    for size in range(2, maxSize + 1):
+        if len(paths) == 0:
+            break
+
+        # Extend every path by every neighbour of its last atom
+        last = paths[:, -1]
+        counts = degree[last]
+        steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        nextAtoms = neighbours[np.repeat(indptr[last], counts) + steps]
+        paths = np.repeat(paths, counts, axis=0)
+
+        # Paths of three or more atoms that return to the first atom close a ring
+        if size >= 3:
+            found = paths[(nextAtoms == paths[:, 0]) & (paths[:, 1] < paths[:, -1])]
+            if len(found) > 0:
+                rings.setdefault(size, []).append(found)
+
+        # Keep simple paths through atoms higher than the first
+        keep = (nextAtoms > paths[:, 0]) & (paths != nextAtoms[:, None]).all(axis=1)
+        paths = np.column_stack((paths[keep], nextAtoms[keep])) if size < maxSize else paths[:0]
+
+# Pick the smallest set of smallest rings from the output of allRings. Rings
+# are taken smallest first and kept if their set of bonds can't be made from
+# the bonds of rings already kept (by symmetric difference). Returns a list of
+# rings as arrays of atom indices in ring order.
+def smallestRings(nAtoms, bonds, maxSize=MAX_RING_SIZE):
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    bondKeys = np.sort(bonds.min(axis=1) * nAtoms + bonds.max(axis=1))
+
+    basis = {}
+    sssr = []
+    for rings, size in allRings(nAtoms, bonds, maxSize):
+        # Bond indices of each ring
+        ringPairs = np.stack((rings, np.roll(rings, -1, axis=1)), axis=2)
+        ringBonds = np.searchsorted(bondKeys, ringPairs.min(axis=2) * nAtoms + ringPairs.max(axis=2))
+
+        for ring, ringBondIDs in zip(rings, ringBonds):
+            vector = set(ringBondIDs.tolist())
+            while len(vector) > 0:
+                pivot = max(vector)
+                if pivot not in basis:
+                    basis[pivot] = vector
+                    sssr.append(ring)
+                    break
+                vector = vector.symmetric_difference(basis[pivot])
+
+    return sssr
+
+# Return the RMS distance of the atoms of each ring (an (R, size) array) from
+# their best fit plane. Ring atoms are placed along the ring bonds using the
+# minimum image if a box is given.
+def ringPlanarity(coords, rings, box=None):
+    steps = coords[np.roll(rings, -1, axis=1)] - coords[rings]
+    if box is not None:
+        box = np.asarray(box, dtype=float)
+        if box.ndim == 1:
+            box = np.diag(box)
+        fractional = steps @ np.linalg.inv(box)
+        steps = (fractional - np.round(fractional)) @ box
+    positions = np.cumsum(steps, axis=1)
+    positions -= positions.mean(axis=1)[:, None]
+
+    # Smallest singular value is the out of plane spread
+    singularValues = np.linalg.svd(positions, compute_uv=False)
+
+    return singularValues[:, -1] / np.sqrt(rings.shape[1])
+
+# Find the aromatic rings of the SSSR. A ring is aromatic if it is planar, all
+# of its atoms are sp2 C or N, planar three-coordinate N or two-coordinate O,
+# and it has 4n + 2 pi electrons. C gives one electron (none with a double bond
+# to a terminal O outside the ring), two-coordinate N one, and three-coordinate
+# N and O two. Returns a list of aromatic rings as arrays of atom indices.
+def aromaticRings(elements, hybrid, coords, bonds, box=None):
+    nAtoms = len(elements)
+    indptr, neighbours, bondIDs = dr.adjacency(nAtoms, bonds)
+    degree = np.diff(indptr)
+
+    # Sp2 C with a terminal O (e.g. quinones, pyridones) gives no electrons
+    atomIDs = np.repeat(np.arange(nAtoms), degree)
+    carbonyl = np.zeros(nAtoms, dtype=bool)
+    terminalO = (elements[neighbours] == "O") & (degree[neighbours] == 1) & (hybrid[neighbours] == "2")
+    carbonyl[atomIDs[terminalO]] = True
+
+    electrons = np.full(nAtoms, -1, dtype=np.int64)
+    electrons[(elements == "C") & (hybrid == "2")] = 1
+    electrons[(elements == "C") & (hybrid == "2") & carbonyl] = 0
+    electrons[(elements == "N") & (hybrid == "2") & (degree == 2)] = 1
+    electrons[(elements == "N") & (hybrid == "R")] = 2
+    electrons[(elements == "O") & (degree == 2)] = 2
+
+    aromatic = []
+    sssr = smallestRings(nAtoms, bonds)
+    for size in np.unique([len(ring) for ring in sssr]):
+        rings = np.array([ring for ring in sssr if len(ring) == size])
+        ringElectrons = electrons[rings]
+        candidate = (ringElectrons >= 0).all(axis=1) & (ringElectrons.sum(axis=1) % 4 == 2)
+        candidate[candidate] = ringPlanarity(coords, rings[candidate], box) < PLANAR_RMS
+        aromatic += list(rings[candidate])
+
+    return aromatic
+
+# Return a boolean mask of the bonds that join neighbouring atoms of any ring
+def ringBondMask(nAtoms, bonds, rings):
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    mask = np.zeros(len(bonds), dtype=bool)
+    if len(rings) == 0:
+        return mask
+
+    bondKeys = bonds.min(axis=1) * nAtoms + bonds.max(axis=1)
+    bondOrder = np.argsort(bondKeys)
+    pairs = np.array([(ring[x], ring[(x + 1) % len(ring)]) for ring in rings for x in range(len(ring))])
+    pairKeys = pairs.min(axis=1) * nAtoms + pairs.max(axis=1)
+    mask[bondOrder[np.searchsorted(bondKeys[bondOrder], pairKeys)]] = True
+
+    return mask
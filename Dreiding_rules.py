@@ -0,0 +1,569 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to read the compiled moltemplate force field
+# (dreiding.lt) and work with its wildcard rules. Rules are matched against
+# atom labels in the same way as moltemplate; a * matches any run of characters
+# and a ? matches a single character. The force field is kept as a list of
+# (block, line) tuples so that any filtered version can be written back out
+# with the original layout and rule order.
+##############################################################################
+
+# Import packages
+import re
+import numpy as np
+from fnmatch import fnmatchcase
+
+# Interaction prefixes used for type names in the force field
+interactions = ["bond", "angle", "dihedral", "improper"]
+
+# Regular expressions for the parts of the force field lines
+blockStart = re.compile(r'write_once\("([^"]+)"\)\s*\{')
+atomPattern = re.compile(r'@atom:(\S+)')
+typeName = re.compile(r'@(bond|angle|dihedral|improper):(\S+)')
+
+# Check if a label matches a moltemplate wildcard pattern
+def matches(pattern, label):
+    return fnmatchcase(label, pattern)
+
+# Check if a wildcard pattern matches at least one label in a collection
+def matchesAny(pattern, labels):
+    return any(fnmatchcase(label, pattern) for label in labels)
+
+# Import force field and store each line with the write_once block it is in
+def readForceField(filename):
+    ffLines = []
+    block = None
+
+    with open(filename, 'r') as file:
+        for line in file:
+            start = blockStart.search(line)
+            if start is not None:
+                ffLines.append((None, line))
+                block = start.group(1)
+                continue
+            # Blocks are closed by a bracket at the start of the line
+            if block is not None and line.strip().startswith("}"):
+                block = None
+            ffLines.append((block, line))
+
+    return ffLines
+
+# Return the list of (typeName, atomPatterns) rules of a By Type block in file order
+def readRules(ffLines, interaction):
+    rules = []
+    for block, line in ffLines:
+        if block is None or not block.startswith("Data " + interaction.capitalize() + "s By Type"):
+            continue
+        name = typeName.search(line)
+        if name is None:
+            continue
+        rules.append((name.group(2), tuple(atomPattern.findall(line))))
+
+    return rules
+
+# Return a dictionary of type name to coefficient string for an interaction
+def readCoeffs(ffLines, interaction):
+    coeffs = {}
+    for block, line in ffLines:
+        if block != "In Settings":
+            continue
+        words = line.split()
+        if len(words) < 2 or words[0] != interaction + "_coeff":
+            continue
+        coeffs[words[1].split(":", 1)[1]] = " ".join(words[2:])
+
+    return coeffs
+
+# Return the labels used by atoms in molecule .lt files (e.g. xyzToMoltemplate output)
+def labelsFromLT(filenames):
+    labels = set()
+    for filename in filenames:
+        with open(filename, 'r') as file:
+            for label in atomPattern.findall(file.read()):
+                # Wildcards only appear in force field rules, not in atoms
+                if "*" in label or "?" in label:
+                    continue
+                labels.add(label)
+
+    return labels
+
+# Remove every rule and coefficient that can't match any of the given labels.
+# If the type names used by a system are already known (usedTypes, a dictionary
+# of interaction - set of type names) the By Type rules are removed entirely and
+# only the coefficients of those types are kept.
+def pruneForceField(ffLines, labels, usedTypes=None):
+    # Rules are kept only if every atom pattern matches a used label
+    def usable(line):
+        return all(matchesAny(pattern, labels) for pattern in atomPattern.findall(line))
+
+    # Find the type names that survive in the By Type blocks first
+    keptTypes = {interaction: set() for interaction in interactions}
+    if usedTypes is not None:
+        keptTypes.update(usedTypes)
+    else:
+        for block, line in ffLines:
+            if block is None or "By Type" not in block:
+                continue
+            name = typeName.search(line)
+            if name is not None and usable(line):
+                keptTypes[name.group(1)].add(name.group(2))
+
+    prunedLines = []
+    for block, line in ffLines:
+        if block == "Data Masses":
+            labelMass = atomPattern.search(line)
+            if labelMass is not None and labelMass.group(1) not in labels:
+                continue
+        elif block is not None and "By Type" in block:
+            name = typeName.search(line)
+            if name is not None and (usedTypes is not None or name.group(2) not in keptTypes[name.group(1)]):
+                continue
+        elif block == "In Settings":
+            name = typeName.search(line)
+            if name is not None and name.group(2) not in keptTypes[name.group(1)]:
+                continue
+            if line.split()[:1] == ["pair_coeff"] and not usable(line):
+                continue
+        prunedLines.append(line)
+
+    return prunedLines
+
+# Return a boolean numpy mask of the labels that a pattern matches
+def patternMask(pattern, labels, maskCache):
+    if pattern not in maskCache:
+        maskCache[pattern] = np.array([fnmatchcase(label, pattern) for label in labels])
+    return maskCache[pattern]
+
+# Build the wildcard patterns that compacted rules may use. Candidates are
+# all label prefixes followed by *, *_flag* patterns for each label flag and
+# the patterns already used by the rules. Only one pattern is kept for each
+# set of matched labels, with broader and already used patterns first.
+def patternVocabulary(labels, rulePatterns, maskCache):
+    candidates = ["*"] + sorted(rulePatterns)
+    generated = set()
+    for label in labels:
+        generated.add(label)
+        for k in range(1, len(label)):
+            generated.add(label[:k] + "*")
+        for flag in label.split("_")[1:]:
+            generated.add("*_" + flag + "*")
+            generated.add("*_" + flag)
+    candidates += sorted(generated, key=lambda pattern: (len(pattern), pattern))
+
+    vocabulary = []
+    seenMasks = set()
+    for pattern in candidates:
+        mask = patternMask(pattern, labels, maskCache)
+        if not mask.any() or mask.tobytes() in seenMasks:
+            continue
+        seenMasks.add(mask.tobytes())
+        vocabulary.append(pattern)
+
+    return vocabulary, np.array([maskCache[pattern] for pattern in vocabulary])
+
+# Cover a set of labels with vocabulary patterns that only match labels in the set
+def coverLabels(target, vocabMasks):
+    valid = ~(vocabMasks & ~target).any(axis=1)
+    uncovered = target.copy()
+    cover = []
+    while uncovered.any():
+        gain = np.where(valid, (vocabMasks & uncovered).sum(axis=1), 0)
+        best = int(np.argmax(gain))
+        cover.append(best)
+        uncovered &= ~vocabMasks[best]
+
+    return cover
+
+# Cover a 2D label-pair table with J x K pattern rectangles, greedily picking
+# the rectangle that covers the most uncovered pairs. A rectangle is only valid
+# if every pair it matches is in the table.
+def coverPairs(target, vocabMasks):
+    vocabFloat = vocabMasks.astype(float)
+    # Labels K that pair with every label J matched by each pattern
+    rowAll = (vocabFloat @ (~target).astype(float)) == 0
+    valid = ((~rowAll).astype(float) @ vocabFloat.T) == 0
+    uncovered = target.copy()
+    cover = []
+    while uncovered.any():
+        gain = np.where(valid, vocabFloat @ uncovered.astype(float) @ vocabFloat.T, 0)
+        best = np.unravel_index(int(np.argmax(gain)), gain.shape)
+        cover.append(best)
+        uncovered &= ~np.outer(vocabMasks[best[0]], vocabMasks[best[1]])
+
+    return cover
+
+# Compact one case of dihedral rules (I, J, K, L patterns with L always *) into
+# the fewest wildcard rules found that give every concrete label quadruple the
+# same coefficients. The case is resolved over the labels with the last match
+# winning, split into one table per coefficient and each table is then covered
+# by pattern products that never match a quadruple outside of it. The original
+# rules are returned if the case can't be compacted safely, which is when the
+# same central pair can get different coefficients depending on direction.
+def compactDihedrals(rules, labels, maskCache=None):
+    if maskCache is None:
+        maskCache = {}
+    if any(patterns[3] != "*" for patterns, coeff in rules):
+        return rules
+
+    # Resolve case over all I, J, K labels, L is always *
+    nLabels = len(labels)
+    coeffList = list(dict.fromkeys(coeff for patterns, coeff in rules))
+    resolved = np.full((nLabels, nLabels, nLabels), -1, dtype=np.int16)
+    for patterns, coeff in rules:
+        maskI, maskJ, maskK = [patternMask(pattern, labels, maskCache) for pattern in patterns[:3]]
+        resolved[np.ix_(maskI, maskJ, maskK)] = coeffList.index(coeff)
+
+    # Moltemplate matches dihedrals in both directions, so J-K and K-J must agree
+    centralCoeffs = np.array([(resolved == k).any(axis=0) for k in range(len(coeffList))])
+    centralCoeffs = centralCoeffs | centralCoeffs.transpose(0, 2, 1)
+    if (centralCoeffs.sum(axis=0) > 1).any():
+        return rules
+
+    rulePatterns = set(pattern for patterns, coeff in rules for pattern in patterns)
+    vocabulary, vocabMasks = patternVocabulary(labels, rulePatterns, maskCache)
+
+    compactRules = []
+    for k, coeff in enumerate(coeffList):
+        table = resolved == k
+
+        # Group the I labels that share the same J-K table
+        slices = {}
+        for i in np.flatnonzero(table.any(axis=(1, 2))):
+            slices.setdefault(table[i].tobytes(), []).append(i)
+
+        for iLabels in slices.values():
+            iTarget = np.zeros(nLabels, dtype=bool)
+            iTarget[iLabels] = True
+            iCover = coverLabels(iTarget, vocabMasks)
+            pairCover = coverPairs(table[iLabels[0]], vocabMasks)
+            for i in iCover:
+                for j, l in pairCover:
+                    compactRules.append(((vocabulary[i], vocabulary[j], vocabulary[l], "*"), coeff))
+
+    # Keep the original rules if compacting doesn't make the case smaller
+    if len(compactRules) >= len(rules):
+        return rules
+
+    return compactRules
+
+# Return the index of the rule that wins for each label tuple, matching only
+# in the order the patterns are written. Later rules overwrite earlier ones.
+def forwardWinners(rules, labels, maskCache, nBody):
+    winners = np.full((len(labels),) * nBody, -1, dtype=np.int32)
+    for index, (name, patterns) in enumerate(rules):
+        masks = [patternMask(pattern, labels, maskCache) for pattern in patterns[:nBody]]
+        winners[np.ix_(*masks)] = index
+
+    return winners
+
+# Find the rules that at least one tuple of labels resolves to. Moltemplate
+# checks bonds, angles and dihedrals in both directions and impropers (with
+# cenIsortJKL.py) with the central atom first and J, K, L in any order. The
+# last rule to match in any direction wins.
+def reachableRules(rules, interaction, labels, maskCache=None):
+    if maskCache is None:
+        maskCache = {}
+
+    if interaction == "bond":
+        winners = forwardWinners(rules, labels, maskCache, 2)
+        winners = np.maximum(winners, winners.T)
+
+    elif interaction == "angle":
+        winners = forwardWinners(rules, labels, maskCache, 3)
+        winners = np.maximum(winners, winners.transpose(2, 1, 0))
+
+    elif interaction == "dihedral":
+        # Rules are turned round so the L pattern is always *, then a rule that
+        # wins I-J-K also wins I-J-K-L for at least one L if it isn't beaten by
+        # every rule matching L-K-J
+        turnedRules = []
+        for name, patterns in rules:
+            if patterns[3] != "*":
+                if patterns[0] != "*":
+                    raise Exception("Dihedral rule " + name + " has no wildcard for the I or L atom.")
+                patterns = patterns[::-1]
+            turnedRules.append((name, patterns))
+        winners = forwardWinners(turnedRules, labels, maskCache, 3)
+        reverseMin = winners.min(axis=0).T
+        winners = winners[winners >= reverseMin[np.newaxis, :, :]]
+
+    elif interaction == "improper":
+        # Only the central atom is typed in DREIDING impropers
+        for name, patterns in rules:
+            if any(pattern != "*" for pattern in patterns[1:]):
+                raise Exception("Improper rule " + name + " has a J, K or L atom that isn't a wildcard.")
+        winners = forwardWinners(rules, labels, maskCache, 1)
+
+    reachable = set(np.unique(winners).tolist())
+    reachable.discard(-1)
+
+    return reachable
+
+# Remove By Type rules by their index in each block. Coefficients are removed
+# when none of the remaining rules use their type name.
+def removeRules(ffLines, deadRules):
+    ruleCounter = {interaction: 0 for interaction in interactions}
+    keptLines = []
+    keptNames = {interaction: set() for interaction in interactions}
+    for block, line in ffLines:
+        name = typeName.search(line)
+        if block is not None and "By Type" in block and name is not None:
+            interaction = name.group(1)
+            index = ruleCounter[interaction]
+            ruleCounter[interaction] += 1
+            if index in deadRules.get(interaction, set()):
+                continue
+            keptNames[interaction].add(name.group(2))
+        keptLines.append((block, line))
+
+    remainingLines = []
+    for block, line in keptLines:
+        name = typeName.search(line)
+        if block == "In Settings" and name is not None and name.group(1) in deadRules:
+            if name.group(2) not in keptNames[name.group(1)]:
+                continue
+        remainingLines.append(line)
+
+    return remainingLines
+
+# Number of atoms in each interaction
+nBodies = {"bond": 2, "angle": 3, "dihedral": 4, "improper": 4}
+
+# Return the orders of a label tuple that moltemplate checks the rules against
+def orderings(interaction, labels):
+    if interaction == "improper":
+        # cenIsortJKL.py - central atom first, J, K, L in any order
+        centre, j, k, l = labels
+        return [(centre, j, k, l), (centre, j, l, k), (centre, k, j, l),
+                (centre, k, l, j), (centre, l, j, k), (centre, l, k, j)]
+
+    return [tuple(labels), tuple(labels[::-1])]
+
+# Build a lookup index for the By Type rules of a force field. Each position
+# of each interaction stores, for every distinct pattern, an integer bitset of
+# the rules using it. A label's bitset is the union of the bitsets of the
+# patterns it matches, so the rules matching a whole tuple are the AND of the
+# label bitsets and the last matching rule is the highest set bit. Label
+# bitsets and resolved tuples are cached, so repeated lookups are a single
+# dictionary access.
+def buildIndex(ffLines):
+    index = {}
+    for interaction in interactions:
+        rules = readRules(ffLines, interaction)
+        coeffs = readCoeffs(ffLines, interaction)
+
+        patternBits = [{} for position in range(nBodies[interaction])]
+        for ruleNumber, (name, patterns) in enumerate(rules):
+            for position, pattern in enumerate(patterns):
+                patternBits[position][pattern] = patternBits[position].get(pattern, 0) | (1 << ruleNumber)
+
+        index[interaction] = {
+            "rules": rules,
+            "coeffs": coeffs,
+            "patternBits": patternBits,
+            "labelBits": [{} for position in range(nBodies[interaction])],
+            "cache": {},
+        }
+
+    return index
+
+# Return the bitset of rules whose pattern at a position matches a label
+def labelBits(interactionIndex, position, label):
+    positionBits = interactionIndex["labelBits"][position]
+    if label not in positionBits:
+        bits = 0
+        for pattern, ruleBits in interactionIndex["patternBits"][position].items():
+            if fnmatchcase(label, pattern):
+                bits |= ruleBits
+        positionBits[label] = bits
+
+    return positionBits[label]
+
+# Return the (typeName, coefficients) that a tuple of labels resolves to, e.g.
+# lookup(index, "dihedral", ("O_3", "C_R", "C_R", "H")). None is returned if
+# no rule matches the labels.
+def lookup(index, interaction, labels):
+    interactionIndex = index[interaction]
+    labels = tuple(labels)
+    cache = interactionIndex["cache"]
+    if labels in cache:
+        return cache[labels]
+
+    lastRule = -1
+    for ordered in orderings(interaction, labels):
+        bits = -1
+        for position, label in enumerate(ordered):
+            bits &= labelBits(interactionIndex, position, label)
+            if bits == 0:
+                break
+        lastRule = max(lastRule, bits.bit_length() - 1)
+
+    if lastRule == -1:
+        result = None
+    else:
+        name = interactionIndex["rules"][lastRule][0]
+        result = (name, interactionIndex["coeffs"].get(name))
+    cache[labels] = result
+
+    return result
+
+# Import a molecule .lt file in the LAMMPS 'full' style written by xyzToMoltemplate.
+# Atoms and bonds are returned as a dictionary of lists and numpy arrays with
+# bonds stored as pairs of atom indices.
+def readMolecule(filename):
+    molecule = {"Names": [], "Labels": [], "Charges": [], "Coords": [], "BondNames": [], "Bonds": []}
+    block = None
+
+    with open(filename, 'r') as file:
+        for line in file:
+            start = re.search(r'write(?:_once)?\("([^"]+)"\)\s*\{', line)
+            if start is not None:
+                block = start.group(1)
+                continue
+            if line.strip().startswith("}"):
+                block = None
+                continue
+
+            words = line.split()
+            if block == "Data Atoms" and len(words) >= 7:
+                molecule["Names"].append(words[0].split(":", 1)[1])
+                molecule["Labels"].append(words[2].split(":", 1)[1])
+                molecule["Charges"].append(float(words[3]))
+                molecule["Coords"].append([float(value) for value in words[4:7]])
+            elif block == "Data Bond List" and len(words) >= 3:
+                molecule["BondNames"].append(words[0].split(":", 1)[1])
+                molecule["Bonds"].append([words[1].split(":", 1)[1], words[2].split(":", 1)[1]])
+
+    # Convert atom names in bonds to atom indices
+    atomIndex = {name: index for index, name in enumerate(molecule["Names"])}
+    molecule["Bonds"] = np.array([[atomIndex[a], atomIndex[b]] for a, b in molecule["Bonds"]], dtype=np.int64).reshape(-1, 2)
+    molecule["Charges"] = np.array(molecule["Charges"])
+    molecule["Coords"] = np.array(molecule["Coords"]).reshape(-1, 3)
+
+    return molecule
+
+# Build a compressed sparse row adjacency from an array of bonds (atom index
+# pairs). The neighbours of atom a are neighbours[indptr[a]:indptr[a + 1]] in
+# ascending order and bondIDs gives the row of bonds that joins them.
+def adjacency(nAtoms, bonds):
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    atoms = np.concatenate((bonds[:, 0], bonds[:, 1]))
+    others = np.concatenate((bonds[:, 1], bonds[:, 0]))
+    bondIDs = np.tile(np.arange(len(bonds)), 2)
+
+    order = np.lexsort((others, atoms))
+    indptr = np.zeros(nAtoms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(atoms, minlength=nAtoms), out=indptr[1:])
+
+    return indptr, others[order], bondIDs[order]
+
+# Expand each entry of starts into one entry per position from starts[x] up to
+# (not including) stops[x]. Returns the index of the entry each position came
+# from and the positions.
+def expandRanges(starts, stops):
+    counts = np.maximum(stops - starts, 0)
+    entries = np.repeat(np.arange(len(starts)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + starts[entries]
+
+    return entries, positions
+
+# Find every angle, dihedral and improper from the bonds of a molecule. Angles
+# are i-j-k with i < k, dihedrals are i-j-k-l with j < k and impropers are a
+# central atom followed by three of its neighbours in ascending order
+# (cenIsortJKL.py). Each is returned as a numpy array of atom indices. All of
+# them are built from the CSR adjacency as batched array operations: each
+# neighbour entry of an atom is paired with the later entries of the same atom.
+def enumerateTopology(nAtoms, bonds):
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    indptr, neighbours, bondIDs = adjacency(nAtoms, bonds)
+    degree = np.diff(indptr)
+
+    # Central atom and end of the neighbour range of every neighbour entry
+    centres = np.repeat(np.arange(nAtoms), degree)
+    ends = indptr[centres + 1]
+
+    # Angles - pairs of neighbour entries p < q of each atom
+    pairEntries, second = expandRanges(np.arange(len(neighbours)) + 1, ends)
+    first = pairEntries
+    angles = np.column_stack((neighbours[first], centres[first], neighbours[second]))
+
+    # Impropers - a third entry r > q for every pair
+    tripleEntries, third = expandRanges(second + 1, ends[second])
+    impropers = np.column_stack((centres[first[tripleEntries]], neighbours[first[tripleEntries]],
+                                 neighbours[second[tripleEntries]], neighbours[third]))
+
+    # Dihedrals - every neighbour i of j and l of k for each bond j < k
+    j = bonds.min(axis=1)
+    k = bonds.max(axis=1)
+    bondEntries, iPositions = expandRanges(indptr[j], indptr[j + 1])
+    i = neighbours[iPositions]
+    keep = i != k[bondEntries]
+    bondEntries, i = bondEntries[keep], i[keep]
+    dihedralEntries, lPositions = expandRanges(indptr[k[bondEntries]], indptr[k[bondEntries] + 1])
+    l = neighbours[lPositions]
+    bondEntries, i = bondEntries[dihedralEntries], i[dihedralEntries]
+    keep = (l != j[bondEntries]) & (l != i)
+    dihedrals = np.column_stack((i[keep], j[bondEntries[keep]], k[bondEntries[keep]], l[keep]))
+
+    return {
+        "angle": angles.reshape(-1, 3),
+        "dihedral": dihedrals.reshape(-1, 4),
+        "improper": impropers.reshape(-1, 4),
+    }
+
+# Resolve an array of interactions (atom indices) to their type names. Each
+# distinct tuple of labels is looked up once and the result is broadcast back
+# to all interactions. Interactions that no rule matches are dropped as
+# moltemplate would not create them. Returns the kept interactions and an
+# array of their type names.
+def resolveInteractions(index, interaction, labels, atoms):
+    labelNames, labelIDs = np.unique(np.asarray(labels), return_inverse=True)
+    if len(atoms) == 0:
+        return atoms, np.array([], dtype=object)
+
+    uniqueTuples, inverse = np.unique(labelIDs[atoms], axis=0, return_inverse=True)
+    uniqueTypes = []
+    for labelTuple in uniqueTuples:
+        result = lookup(index, interaction, tuple(labelNames[labelTuple]))
+        uniqueTypes.append(None if result is None else result[0])
+    types = np.array(uniqueTypes, dtype=object)[inverse.reshape(-1)]
+
+    typed = types != None
+    return atoms[typed], types[typed]
+
+# Find and type every bond, angle, dihedral and improper of a labelled system.
+# Returns a dictionary of interaction - (atom index array, type name array).
+def typeTopology(index, labels, bonds):
+    topology = enumerateTopology(len(labels), bonds)
+    topology["bond"] = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+
+    return {interaction: resolveInteractions(index, interaction, labels, topology[interaction]) for interaction in interactions}
+
+# Return the pair_coeff lines of the force field as (atom patterns, coefficient
+# words) in file order. Atom labels used as coefficients (e.g. the hydrogen in
+# hbond/dreiding/lj) are kept as @atom: words.
+def readPairCoeffs(ffLines):
+    pairCoeffs = []
+    for block, line in ffLines:
+        words = line.split()
+        if block != "In Settings" or words[:1] != ["pair_coeff"]:
+            continue
+        pairCoeffs.append(((words[1].split(":", 1)[1], words[2].split(":", 1)[1]), words[3:]))
+
+    return pairCoeffs
+
+# Return the contents of a write_once block, e.g. "In Init", as a list of lines
+def readBlock(ffLines, blockName):
+    return [line for block, line in ffLines if block == blockName]
@@ -0,0 +1,67 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file finds the bond, angle, dihedral and improper rules of the force
+# field that no tuple of labels from the Dreiding_label_dictionary can ever
+# resolve to. Moltemplate uses the last rule that matches, so a rule is dead
+# if none of its patterns match a label or if every tuple it matches is also
+# matched by a later rule (e.g. Case B dihedrals that are overridden by Case J).
+# Dead rules and their coefficients are removed and a report is written that
+# lists each of them.
+#
+# Argument 1 is the force field file e.g. 'dreiding.lt'. Argument 2 is the
+# force field file to write without the dead rules. Argument 3 is the report
+# file e.g. 'shadow_report.txt'.
+#
+# This file requires the library Dreiding_rules.py
+##############################################################################
+
+# Import packages
+import sys
+import Dreiding_rules as dr
+from Dreiding_label_dictionary import labelDict
+
+forcefield = sys.argv[1]
+outputFile = sys.argv[2]
+reportFile = sys.argv[3]
+
+labels = list(labelDict.keys())
+
+ffLines = dr.readForceField(forcefield)
+
+# Mask cache is shared so that label patterns are only matched once
+maskCache = {}
+deadRules = {}
+
+with open(reportFile, 'w') as report:
+    report.write("Dead rule report for " + forcefield + " using " + str(len(labels)) + " labels\n")
+
+    for interaction in dr.interactions:
+        rules = dr.readRules(ffLines, interaction)
+        reachable = dr.reachableRules(rules, interaction, labels, maskCache)
+        deadRules[interaction] = set(range(len(rules))).difference(reachable)
+
+        report.write("\n" + interaction.capitalize() + "s: " + str(len(rules)) + " rules, " + str(len(deadRules[interaction])) + " dead\n")
+        for index in sorted(deadRules[interaction]):
+            name, patterns = rules[index]
+            # Dead rules either match no label at all or are always overridden
+            if any(not dr.patternMask(pattern, labels, maskCache).any() for pattern in patterns):
+                reason = "no matching label"
+            else:
+                reason = "overridden by later rules"
+            report.write("\t@" + interaction + ":" + name + " @atom:" + " @atom:".join(patterns) + "\t(" + reason + ")\n")
+
+# Write force field without the dead rules
+with open(outputFile, 'w') as file:
+    file.writelines(dr.removeRules(ffLines, deadRules))
@@ -0,0 +1,92 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file types every bond, angle, dihedral and improper of a labelled
+# molecule directly in python, so that moltemplate doesn't have to match the
+# By Type rules of the force field. Interactions are found from the bond list
+# and each distinct combination of labels is resolved once with the force
+# field lookup index, using the same last-match rules as moltemplate.
+#
+# The molecule is written with explicit "Data Bonds", "Data Angles",
+# "Data Dihedrals" and "Data Impropers" sections in place of the "Data Bond
+# List". A matching force field file is written without the By Type rules and
+# with only the masses and coefficients the molecule uses; the molecule file
+# imports it in place of the full force field.
+#
+# Argument 1 is the force field file e.g. 'dreiding.lt'. Argument 2 is the
+# labelled molecule file from xyzToMoltemplate e.g. 'methanol.lt'. Argument 3
+# is the molecule file to write e.g. 'methanol_typed.lt'. Argument 4 is the
+# force field file to write e.g. 'dreiding_typed.lt'.
+#
+# This file requires the library Dreiding_rules.py
+##############################################################################
+
+# Import packages
+import os
+import sys
+import numpy as np
+import Dreiding_rules as dr
+
+forcefield = sys.argv[1]
+moleculeFile = sys.argv[2]
+outputFile = sys.argv[3]
+outputForcefield = sys.argv[4]
+
+# Read molecule and force field, then build lookup index
+molecule = dr.readMolecule(moleculeFile)
+ffLines = dr.readForceField(forcefield)
+index = dr.buildIndex(ffLines)
+
+labels = molecule["Labels"]
+atomNames = np.array(molecule["Names"], dtype=object)
+
+# Find and type every interaction
+typedTopology = dr.typeTopology(index, labels, molecule["Bonds"])
+usedTypes = {interaction: set(types) for interaction, (atoms, types) in typedTopology.items()}
+
+# Return a write block of typed interactions as a single string, empty if there are none
+def typedBlock(interaction, atoms, types):
+    if len(atoms) == 0:
+        return ''
+    sectionName = "Data " + interaction.capitalize() + "s"
+    lines = ['\t\t$' + interaction + ':' + str(number) + '\t@' + interaction + ':' + typeName + '\t$atom:' + '\t$atom:'.join(atomNames[atomGroup]) + '\n'
+             for number, (atomGroup, typeName) in enumerate(zip(atoms, types))]
+
+    return '\twrite("' + sectionName + '") {\n' + ''.join(lines) + '\t}\n'
+
+# Write molecule with explicit typed interactions in place of the bond list
+################################################################################
+with open(moleculeFile, 'r') as file:
+    moleculeLines = file.readlines()
+
+with open(outputFile, 'w') as file:
+    skipBlock = False
+    for line in moleculeLines:
+        if line.startswith('import '):
+            file.write('import "' + os.path.basename(outputForcefield) + '"\n')
+        elif 'write("Data Bond List")' in line:
+            skipBlock = True
+            for interaction in dr.interactions:
+                file.write(typedBlock(interaction, *typedTopology[interaction]))
+        elif skipBlock:
+            if line.strip().startswith("}"):
+                skipBlock = False
+        else:
+            file.write(line)
+
+# Write force field without By Type rules
+with open(outputForcefield, 'w') as file:
+    file.writelines(dr.pruneForceField(ffLines, set(labels), usedTypes))
+
+print("Typed " + ", ".join(str(len(typedTopology[interaction][0])) + " " + interaction + "s" for interaction in dr.interactions))
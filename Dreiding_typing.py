@@ -0,0 +1,375 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to assign DREIDING labels to atoms automatically
+# from their elements, coordinates and bonds (e.g. from bondCalculation in
+# xyzFunctions.py), following the DREIDING_Label_Manual.pdf. Labels are built
+# in the order of the manual:
+#   element_hybridisation - from the coordination and geometry of each atom,
+#                           atoms in aromatic rings are R (Dreiding_rings.py)
+#   _b1/_b2 - from bond orders (single, double, triple or resonant), so that
+#             the bond orders that Dreiding_bond.py gives each pair of labels
+#             match the molecule
+#   _dN - from the number of neighbours, N is the neighbours minus one
+#   _hd/_ha - N, O and F with a hydrogen are donors, and without are acceptors
+#             when the system has donors
+# Flags are dropped (hX first) when the full label isn't in labelDict.
+# Explicit hydrogens are expected, so united atom labels (e.g. C_33) are not used.
+#
+# This file requires the libraries Dreiding_rules.py and Dreiding_rings.py
+##############################################################################
+
+# Import packages
+import numpy as np
+from collections import deque
+import Dreiding_rules as dr
+import Dreiding_rings as dg
+import Dreiding_label_dictionary as ld
+from Dreiding_label_dictionary import labelDict
+
+# Elements that can donate (with a hydrogen) and accept hydrogen bonds
+hydrogenBondElements = ["N", "O", "F"]
+
+# Valence of the elements that can form double and triple bonds
+valences = {"C": 4, "N": 3, "O": 2}
+
+# Elements that use the coordination and geometry to find the hybridisation.
+# All other elements only have sp3 (_3) or element-only labels.
+hybridElements = ["C", "N", "O", "B"]
+
+# Two-coordinate atoms with a bond angle above this (degrees) are linear (sp1)
+LINEAR_ANGLE = 155.0
+
+# Three-coordinate atoms are planar (sp2) when the volume of their three unit
+# bond vectors is below this. An ideal sp3 atom has a volume of 0.77.
+PLANAR_VOLUME = 0.35
+
+# Return the vectors from atoms to their neighbours using the minimum image if
+# a box (three lengths or a 3x3 matrix of box vectors) is given
+def bondVectors(coords, atoms, others, box=None):
+    vectors = coords[others] - coords[atoms]
+    if box is not None:
+        box = np.asarray(box, dtype=float)
+        if box.ndim == 1:
+            box = np.diag(box)
+        fractional = vectors @ np.linalg.inv(box)
+        vectors = (fractional - np.round(fractional)) @ box
+
+    return vectors / np.linalg.norm(vectors, axis=1)[:, None]
+
+# Return the bond angle (degrees) of two-coordinate atoms and the volume of the
+# unit bond vectors of three-coordinate atoms, both zero for other atoms
+def geometry(coords, indptr, neighbours, box=None):
+    degree = np.diff(indptr)
+    angles = np.zeros(len(degree))
+    volumes = np.zeros(len(degree))
+
+    atoms = np.flatnonzero(degree == 2)
+    if len(atoms) > 0:
+        first = bondVectors(coords, atoms, neighbours[indptr[atoms]], box)
+        second = bondVectors(coords, atoms, neighbours[indptr[atoms] + 1], box)
+        angles[atoms] = np.degrees(np.arccos(np.clip((first * second).sum(axis=1), -1.0, 1.0)))
+
+    atoms = np.flatnonzero(degree == 3)
+    if len(atoms) > 0:
+        vectors = [bondVectors(coords, atoms, neighbours[indptr[atoms] + x], box) for x in range(3)]
+        volumes[atoms] = np.abs((np.cross(vectors[0], vectors[1]) * vectors[2]).sum(axis=1))
+
+    return angles, volumes
+
+# Find the hybridisation ('3', '2', '1' or 'R') of each atom. C, N and B use
+# their coordination, with two-coordinate atoms linear (sp1) or bent (sp2) and
+# three-coordinate N planar (R, e.g. amides and anilines) or pyramidal (sp3).
+# Terminal N and O take their hybridisation from the atom they are bonded to.
+def hybridisation(elements, indptr, neighbours, angles, volumes):
+    degree = np.diff(indptr)
+    hybrid = np.full(len(elements), "3", dtype="<U1")
+    isC = elements == "C"
+    isN = elements == "N"
+    isO = elements == "O"
+    isB = elements == "B"
+    linear = angles > LINEAR_ANGLE
+
+    hybrid[isC & (degree == 3)] = "2"
+    hybrid[isC & (degree == 2)] = np.where(linear[isC & (degree == 2)], "1", "2")
+    hybrid[isC & (degree == 1)] = "1"
+
+    hybrid[isN & (degree == 3) & (volumes < PLANAR_VOLUME)] = "R"
+    hybrid[isN & (degree == 2)] = np.where(linear[isN & (degree == 2)], "1", "2")
+
+    hybrid[isB & (degree < 4)] = "2"
+
+    # Terminal N is a nitrile (N_1) when bonded to an sp1 atom, otherwise sp2
+    terminal = np.flatnonzero(isN & (degree == 1))
+    partners = neighbours[indptr[terminal]]
+    hybrid[terminal] = np.where(hybrid[partners] == "1", "1", "2")
+
+    # Terminal O is a hydroxide or alkoxide (O_3) on H or sp3 C/N, carbon
+    # monoxide (O_1) on a one-coordinate C, otherwise a double bond (O_2)
+    terminal = np.flatnonzero(isO & (degree == 1))
+    partners = neighbours[indptr[terminal]]
+    partnerElements = elements[partners]
+    single = (partnerElements == "H") | (np.isin(partnerElements, ["C", "N"]) & (hybrid[partners] == "3"))
+    triple = (hybrid[partners] == "1") & (degree[partners] == 1)
+    hybrid[terminal] = np.where(single, "3", np.where(triple, "1", "2"))
+
+    # Unbonded and other elements keep sp3
+    hybrid[~np.isin(elements, hybridElements) | (degree == 0)] = "3"
+
+    return hybrid
+
+# Return the number of pi bonds each atom needs: one for sp2 C, N and O and two
+# for sp1 (triple or two double bonds), but never more than the valence of the
+# element allows with its neighbours. R atoms and boron need none.
+def piDemand(elements, hybrid, degree):
+    demand = np.zeros(len(elements), dtype=np.int64)
+    for element, valence in valences.items():
+        isElement = elements == element
+        demand[isElement & (hybrid == "2")] = 1
+        demand[isElement & (hybrid == "1")] = 2
+        demand[isElement] = np.minimum(demand[isElement], np.maximum(valence - degree[isElement], 0))
+
+    return demand
+
+# Give pi bonds to atoms that need them. Atoms are taken in order of fewest
+# unsaturated neighbours, each pairing with its unsaturated neighbours that also
+# have the fewest options first, so chains are filled from their ends. Orders
+# and the remaining pi bonds each atom needs are updated in place.
+def greedyPiBonds(orders, remaining, indptr, neighbours, bondIDs, piBond):
+    # Number of neighbours of each atom that could share a pi bond
+    atomIDs = np.repeat(np.arange(len(remaining)), np.diff(indptr))
+    options = np.bincount(atomIDs, weights=piBond[bondIDs], minlength=len(remaining))
+
+    for atom in np.flatnonzero(remaining > 0)[np.argsort(options[remaining > 0], kind='stable')]:
+        atomNeighbours = neighbours[indptr[atom]:indptr[atom + 1]]
+        atomBonds = bondIDs[indptr[atom]:indptr[atom + 1]]
+        for x in np.argsort(options[atomNeighbours], kind='stable'):
+            if remaining[atom] == 0:
+                break
+            other = atomNeighbours[x]
+            if remaining[other] == 0 or not piBond[atomBonds[x]]:
+                continue
+            piBonds = min(remaining[atom], remaining[other])
+            orders[atomBonds[x]] += piBonds
+            remaining[atom] -= piBonds
+            remaining[other] -= piBonds
+
+# Give double bonds to sp2 atoms the greedy pass left without one, by finding
+# alternating paths of single and double bonds between two such atoms and
+# swapping the orders along the path (as in a maximum matching). The search from
+# each atom is a breadth-first search of the conjugated bonds around it, so the
+# work only depends on the size of the conjugated regions with missing double
+# bonds. Paths that need an odd ring to be contracted (Edmonds blossoms) are not
+# searched for. Orders and remaining are updated in place.
+def augmentPiBonds(orders, remaining, demand, indptr, neighbours, bondIDs, piBond):
+    # Double bond partner of each atom that needs one pi bond
+    single = demand == 1
+    partner = np.full(len(demand), -1, dtype=np.int64)
+    atomIDs = np.repeat(np.arange(len(demand)), np.diff(indptr))
+    paired = single[atomIDs] & single[neighbours] & (orders[bondIDs] == 2) & piBond[bondIDs]
+    partner[atomIDs[paired]] = neighbours[paired]
+
+    for start in np.flatnonzero(single & (remaining == 1)):
+        if remaining[start] == 0:
+            continue
+
+        # Alternating breadth-first search from start, reaching atoms with a
+        # double bond through a single bond and leaving through the double bond
+        parent = {start: -1}
+        queue = deque([start])
+        end = -1
+        while len(queue) > 0 and end < 0:
+            atom = queue.popleft()
+            for x in range(indptr[atom], indptr[atom + 1]):
+                other = neighbours[x]
+                if not single[other] or not piBond[bondIDs[x]] or other == partner[atom] or other in parent:
+                    continue
+                parent[other] = atom
+                if remaining[other] == 1:
+                    end = other
+                    break
+                if partner[other] >= 0 and partner[other] not in parent:
+                    parent[partner[other]] = other
+                    queue.append(partner[other])
+
+        if end < 0:
+            continue
+
+        # Swap the single and double bonds along the path
+        atom = end
+        while True:
+            previous = parent[atom]
+            oldPartner = partner[previous]
+            partner[atom] = previous
+            partner[previous] = atom
+            if previous == start:
+                break
+            atom = oldPartner
+        remaining[start] = 0
+        remaining[end] = 0
+
+    # Rebuild the orders of the single pi bonds from the partners
+    piBonds = single[atomIDs] & single[neighbours] & piBond[bondIDs]
+    orders[bondIDs[piBonds]] = 1
+    orders[bondIDs[piBonds & (partner[atomIDs] == neighbours)]] = 2
+
+# Assign a bond order (1, 1.5, 2 or 3) to each bond. Aromatic bonds (a boolean
+# mask) are resonant (1.5). Other double and triple bonds are placed between
+# atoms that need pi bonds, first greedily and then by swapping bonds along
+# alternating paths so that fused and conjugated systems get a full set.
+def bondOrders(elements, hybrid, bonds, indptr, neighbours, bondIDs, aromatic=None):
+    degree = np.diff(indptr)
+    demand = piDemand(elements, hybrid, degree)
+    remaining = demand.copy()
+    orders = np.ones(len(bonds))
+    if aromatic is None:
+        aromatic = np.zeros(len(bonds), dtype=bool)
+    orders[aromatic] = 1.5
+
+    # Bonds that can be double or triple
+    piBond = ~aromatic & (demand[bonds[:, 0]] > 0) & (demand[bonds[:, 1]] > 0) if len(bonds) > 0 else aromatic
+
+    greedyPiBonds(orders, remaining, indptr, neighbours, bondIDs, piBond)
+    augmentPiBonds(orders, remaining, demand, indptr, neighbours, bondIDs, piBond)
+
+    return orders
+
+# Find the _b1/_b2 flag of each atom from the bond orders, so that the
+# substring checks in Dreiding_bond.py give every bond its order. Bonds between
+# atoms of the same unsaturated hybridisation get a fixed order there (X_2-X_2
+# is 2, X_1-X_1 is 3, X_R-X_R is 1.5) unless both atoms are _b1 (1), both are
+# _b2 (2) or one is _b2 and the other X_2 (1).
+#
+# For sp2 atoms each double bond is a node of a graph joined by the single bonds
+# between sp2 atoms. The graph is coloured in two by a breadth-first search and
+# both atoms of the double bonds of one colour are _b2, so single bonds join _b2
+# and unflagged atoms and double bonds join two of the same. Single bonds that
+# join two unflagged atoms (odd rings of double bonds) are _b1 on both atoms.
+# R and sp1 atoms with a single bond to an atom of the same hybridisation are _b1.
+def bondFlags(hybrid, bonds, orders):
+    flags = np.full(len(hybrid), "", dtype="<U3")
+    if len(bonds) == 0:
+        return flags
+
+    hybridI = hybrid[bonds[:, 0]]
+    hybridJ = hybrid[bonds[:, 1]]
+    sameUnsaturated = (hybridI == hybridJ) & (hybridI != "3")
+    sp2 = sameUnsaturated & (hybridI == "2")
+
+    # R and sp1 single bonds
+    singleBonds = bonds[sameUnsaturated & ~sp2 & (orders == 1)]
+    flags[singleBonds.ravel()] = "_b1"
+
+    # Double bond node of each sp2 atom, atoms without one are their own node
+    node = np.arange(len(hybrid))
+    doubleBonds = bonds[sp2 & (orders == 2)]
+    node[doubleBonds[:, 1]] = doubleBonds[:, 0]
+
+    # Two colour the double bond graph
+    singleBonds = bonds[sp2 & (orders == 1)]
+    nodeBonds = node[singleBonds]
+    indptr, neighbours, bondIDs = dr.adjacency(len(hybrid), nodeBonds)
+    colour = np.full(len(hybrid), -1, dtype=np.int64)
+    for first in np.unique(nodeBonds):
+        if colour[first] >= 0:
+            continue
+        colour[first] = 0
+        queue = deque([first])
+        while len(queue) > 0:
+            current = queue.popleft()
+            for other in neighbours[indptr[current]:indptr[current + 1]]:
+                if colour[other] < 0:
+                    colour[other] = 1 - colour[current]
+                    queue.append(other)
+
+    isSp2 = hybrid == "2"
+    flags[isSp2 & (colour[node] == 1)] = "_b2"
+
+    # Single bonds left between two unflagged atoms
+    sameColour = (colour[nodeBonds[:, 0]] == 0) & (colour[nodeBonds[:, 1]] == 0)
+    flags[singleBonds[sameColour].ravel()] = "_b1"
+
+    return flags
+
+# Return the first label in labelDict from the label with all of its flags,
+# dropping the hX flag, then the dX flag, then both. None if there are none.
+def composeLabel(base, bondFlag, dFlag, hFlag):
+    for label in [base + bondFlag + dFlag + hFlag, base + bondFlag + dFlag, base + bondFlag + hFlag, base + bondFlag]:
+        if label in labelDict:
+            return label
+
+    return None
+
+# Assign DREIDING labels to a system. elements is an array of element symbols,
+# coords an (N, 3) array and bonds an array of atom index pairs. box gives the
+# periodic box the bonds were found in (see neighbourPairs in xyzFunctions.py).
+# Returns an array of labels.
+def typeAtoms(elements, coords, bonds, box=None):
+    elements = np.asarray(elements)
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    nAtoms = len(elements)
+
+    indptr, neighbours, bondIDs = dr.adjacency(nAtoms, bonds)
+    degree = np.diff(indptr)
+    atomIDs = np.repeat(np.arange(nAtoms), degree)
+
+    angles, volumes = geometry(np.asarray(coords, dtype=float), indptr, neighbours, box)
+    hybrid = hybridisation(elements, indptr, neighbours, angles, volumes)
+
+    # Atoms and bonds of aromatic rings are resonant
+    rings = dg.aromaticRings(elements, hybrid, np.asarray(coords, dtype=float), bonds, box)
+    if len(rings) > 0:
+        hybrid[np.concatenate(rings)] = "R"
+    aromatic = dg.ringBondMask(nAtoms, bonds, rings)
+
+    orders = bondOrders(elements, hybrid, bonds, indptr, neighbours, bondIDs, aromatic)
+    flags = bondFlags(hybrid, bonds, orders)
+
+    # Hydrogen bond donors have a hydrogen, acceptors are only needed with donors
+    hydrogens = np.bincount(atomIDs, weights=elements[neighbours] == "H", minlength=nAtoms)
+    canBond = np.isin(elements, hydrogenBondElements)
+    donors = canBond & (hydrogens > 0)
+    acceptors = canBond & (hydrogens == 0) & donors.any()
+
+    labels = np.empty(nAtoms, dtype=object)
+    missing = []
+    for atom in range(nAtoms):
+        element = elements[atom]
+        if element == "H":
+            # Hydrogen bonding hydrogen, diborane bridging hydrogen or standard hydrogen
+            atomNeighbours = neighbours[indptr[atom]:indptr[atom + 1]]
+            if canBond[atomNeighbours].any():
+                labels[atom] = "H_HB"
+            elif degree[atom] == 2 and (elements[atomNeighbours] == "B").all():
+                labels[atom] = "H_B"
+            else:
+                labels[atom] = "H"
+            continue
+
+        base = element if element in labelDict else element + "_" + hybrid[atom]
+        dFlag = "_d" + str(max(degree[atom] - 1, 1))
+        hFlag = "_hd" if donors[atom] else "_ha" if acceptors[atom] else ""
+        labels[atom] = composeLabel(base, flags[atom], dFlag, hFlag)
+        if labels[atom] is None:
+            missing.append((atom, base + flags[atom] + dFlag + hFlag))
+
+    assert(len(missing) == 0), "No DREIDING label for {} atoms, e.g. (atom, label): {}".format(len(missing), missing[:10])
+
+    # Report bonds whose order can't be given by the labels
+    labelFlags = ld.labelColumns(list(labels))["Flags"]
+    wrongOrders = np.flatnonzero(ld.labelBondOrders(labelFlags[bonds[:, 0]], labelFlags[bonds[:, 1]]) != orders)
+    if len(wrongOrders) > 0:
+        print("Warning: " + str(len(wrongOrders)) + " bond orders can't be given by the labels, e.g. atoms " + str(bonds[wrongOrders[:5]].tolist()))
+
+    return labels
@@ -0,0 +1,111 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file converts many .xyz files to moltemplate .lt files at once, running
+# the conversions in parallel on a pool of processes. Each .xyz file is
+# converted as xyzToMoltemplate.py would and gets its own output directory,
+# 'output'/'molecule', so that system.lt files don't overwrite each other.
+# Python, the packages and the forcefield are only loaded once per process.
+#
+# Argument 1 is either a directory, whose .xyz files are all converted, or a
+# manifest file. Each manifest line is an .xyz file path, relative to the
+# manifest, optionally followed by its cubic cell box size; blank lines and
+# lines starting with # are skipped. Argument 2 is the default cubic cell box
+# size in angstroms e.g. '20.0'. Argument 3 is forcefield name without file
+# extension e.g. 'dreiding', read from next to each .xyz file, otherwise from
+# the repository root. Argument 4 is the output directory. Any further
+# arguments are the xyzToMoltemplate options (e.g. lammps, periodic, type) or
+# 'workers=N' to set the number of processes (default: all CPUs).
+#
+# This file requires the library xyzFunctions.py
+##############################################################################
+
+# Import packages
+import os
+import sys
+import glob
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import xyzFunctions as xf
+
+# Forcefield data by forcefield path, shared by every conversion in a process
+workerForcefields = {}
+
+# Store the forcefield data in each process of the pool
+def initWorker(forcefields):
+    global workerForcefields
+    workerForcefields = forcefields
+
+# Convert one .xyz file, returning an error message if it fails
+def convertJob(job):
+    xyzFile, box, ff, options, outputDirectory = job
+    try:
+        forcefieldData = workerForcefields.get(xf.forcefieldPath(xyzFile, ff + ".lt"))
+        xf.convertXYZ(xyzFile, box, ff, options, outputDirectory, forcefieldData)
+    except Exception:
+        return traceback.format_exc()
+
+    return None
+
+# Return a list of (xyz file, box size) from a directory or a manifest file
+def readJobs(source, defaultBox):
+    if os.path.isdir(source):
+        return [(xyzFile, defaultBox) for xyzFile in sorted(glob.glob(os.path.join(source, "*.xyz")))]
+
+    jobs = []
+    manifestDirectory = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r') as manifest:
+        for line in manifest:
+            words = line.split()
+            if len(words) == 0 or words[0].startswith("#"):
+                continue
+            box = words[1] if len(words) > 1 else defaultBox
+            jobs.append((os.path.join(manifestDirectory, words[0]), box))
+
+    return jobs
+
+if __name__ == "__main__":
+    source = sys.argv[1]
+    defaultBox = sys.argv[2]
+    ff = sys.argv[3]
+    outputRoot = sys.argv[4]
+    options = [option for option in sys.argv[5:] if not option.startswith("workers=")]
+    workers = [int(option.split("=")[1]) for option in sys.argv[5:] if option.startswith("workers=")]
+    workers = workers[0] if len(workers) > 0 else None
+
+    # Each molecule is written to its own directory, so names must be unique
+    jobs = readJobs(source, defaultBox)
+    names = [os.path.splitext(os.path.basename(xyzFile))[0] for xyzFile, box in jobs]
+    repeatedNames = {name for name in names if names.count(name) > 1} if len(set(names)) != len(names) else set()
+    assert(len(repeatedNames) == 0), "Molecule names must be unique: {}".format(repeatedNames)
+
+    # Load each forcefield once for LAMMPS output, found as convertXYZ finds it
+    forcefields = {}
+    if "lammps" in options:
+        import Dreiding_lammps as dl
+        for forcefield in {xf.forcefieldPath(xyzFile, ff + ".lt") for xyzFile, box in jobs}:
+            forcefields[forcefield] = dl.loadForceField(forcefield)
+
+    jobArgs = [(xyzFile, box, ff, options, os.path.join(outputRoot, name)) for (xyzFile, box), name in zip(jobs, names)]
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=initWorker, initargs=(forcefields,)) as pool:
+        # Small molecules are sent to the processes in chunks to reduce overheads
+        chunksize = max(1, len(jobArgs) // (4 * (workers or os.cpu_count() or 1)))
+        for name, error in zip(names, pool.map(convertJob, jobArgs, chunksize=chunksize)):
+            if error is not None:
+                failures += 1
+                print("Failed " + name + ":\n" + error)
+
+    print("Converted " + str(len(jobs) - failures) + " of " + str(len(jobs)) + " .xyz files")
@@ -0,0 +1,73 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to build a polymer chain from a monomer (repeat
+# unit), for chainToMoltemplate.py.
+#
+# The tail atom of each repeat unit is bonded to the head atom of the next.
+# Each repeat unit is a rigid copy of the monomer, moved along the chain by
+# the repeat vector that puts the next head one bond length from the tail, in
+# the direction of the tail cap if there is one. All copies are made as one
+# array operation and the bonds inside the monomer are reused for every copy.
+# Cap atoms (e.g. hydrogens on the head and tail) are only kept at the chain
+# ends. The monomer should contain a full period of the chain conformation,
+# e.g. two carbons for an all-trans polyethylene.
+##############################################################################
+
+# Import packages
+import numpy as np
+
+# Length (Angstroms) of the bond between repeat units
+CHAIN_BOND = 1.54
+
+# Return the vector that moves the head of the monomer to the position of the
+# next head, one bond length on from the tail
+def repeatVector(coords, head, tail, tailCap=None, bondLength=CHAIN_BOND):
+    direction = coords[tail] - coords[head] if tailCap is None else coords[tailCap] - coords[tail]
+    direction /= np.linalg.norm(direction)
+
+    return coords[tail] + direction * bondLength - coords[head]
+
+# Build a chain of nUnits copies of a monomer. atoms is from readXYZ, bonds is
+# the monomer's (B, 2) bond array and head, tail, headCap and tailCap are atom
+# indices (caps are optional). Returns the chain's atoms, in the same format,
+# and bonds: the bonds of each unit in turn followed by the bonds between units.
+def buildChain(atoms, bonds, nUnits, head, tail, headCap=None, tailCap=None, bondLength=CHAIN_BOND):
+    nAtoms = len(atoms["Elements"])
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    units = np.arange(nUnits)
+
+    # Rigid copies of the monomer along the chain
+    coords = atoms["Coords"][None, :, :] + units[:, None, None] * repeatVector(atoms["Coords"], head, tail, tailCap, bondLength)
+    chainBonds = np.concatenate(((bonds[None, :, :] + units[:, None, None] * nAtoms).reshape(-1, 2),
+                                 np.column_stack((units[:-1] * nAtoms + tail, units[1:] * nAtoms + head))))
+
+    # Remove the caps between units
+    keep = np.ones((nUnits, nAtoms), dtype=bool)
+    if headCap is not None:
+        keep[1:, headCap] = False
+    if tailCap is not None:
+        keep[:-1, tailCap] = False
+    keep = keep.reshape(-1)
+    newIndex = np.cumsum(keep) - 1
+    chainBonds = newIndex[chainBonds[keep[chainBonds].all(axis=1)]]
+
+    chain = {
+        "Elements": np.tile(atoms["Elements"], nUnits)[keep],
+        "Labels": None if atoms["Labels"] is None else np.tile(atoms["Labels"], nUnits)[keep],
+        "Coords": coords.reshape(-1, 3)[keep],
+        "Charges": np.tile(atoms["Charges"], nUnits)[keep],
+    }
+
+    return chain, chainBonds
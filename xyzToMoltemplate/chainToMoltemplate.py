@@ -0,0 +1,73 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file builds a polymer chain from a monomer .xyz file and writes it as
+# one moltemplate molecule, 'chain'.lt, with a system.lt. The bonds of the
+# monomer are found once and reused for every repeat unit, and the bonds
+# between units are written directly.
+#
+# Argument 1 is the directory of the .xyz file, where the output is written.
+# Argument 2 is the monomer .xyz file name without extension e.g. 'ethylene'.
+# Argument 3 is the number of repeat units. Argument 4 is the chain name e.g.
+# 'polyethylene'. Argument 5 is cubic cell box size in angstroms e.g. '20.0'.
+# Argument 6 is forcefield name without file extension e.g. 'dreiding'.
+# Further arguments are options:
+#   head=N, tail=N - atom numbers (from 1, in .xyz order) of the head and tail
+#                    atoms; each unit's tail is bonded to the next unit's head
+#   headcap=N, tailcap=N - atoms bonded to the head and tail that are only kept
+#                          at the chain ends (optional)
+#   bond=X - length of the bond between units (default: cf.CHAIN_BOND)
+#   type, charges - assign labels and charges to the whole chain, as in
+#                   xyzToMoltemplate.py
+#   radii - as in xyzToMoltemplate.py, for the monomer bonds
+#
+# This file requires the libraries xyzFunctions.py and chainFunctions.py
+##############################################################################
+
+# Import packages
+import os
+import sys
+import xyzFunctions as xf
+import chainFunctions as cf
+
+directory = sys.argv[1]
+monomer = sys.argv[2]
+nUnits = int(sys.argv[3])
+name = sys.argv[4]
+box = sys.argv[5]
+ff = sys.argv[6]
+options = sys.argv[7:]
+settings = dict(option.split("=") for option in options if "=" in option)
+assert("head" in settings and "tail" in settings), "Give the head and tail atoms of the monomer e.g. head=1 tail=4"
+
+# Atom index of an atom number setting, or None if it isn't given
+def atomNumber(setting):
+    return int(settings[setting]) - 1 if setting in settings else None
+
+# Monomer bonds are found once, labels and charges are given to the whole chain
+atoms, labels, bondData, bonds = xf.prepareXYZ(os.path.join(directory, monomer + ".xyz"), box, [option for option in options if option == "radii"])
+chain, chainBonds = cf.buildChain(atoms, bonds, nUnits, atomNumber("head"), atomNumber("tail"), atomNumber("headcap"), atomNumber("tailcap"),
+                                  float(settings.get("bond", cf.CHAIN_BOND)))
+labels = None if chain["Labels"] is None else xf.labelNames[chain["Labels"]]
+
+if labels is None and "type" in options:
+    import Dreiding_typing as dt
+    labels = dt.typeAtoms(xf.elementSymbols[chain["Elements"]], chain["Coords"], chainBonds).astype(str)
+
+if "charges" in options:
+    import qeqFunctions as qf
+    chain["Charges"] = qf.qeqCharges(xf.elementSymbols[chain["Elements"]], chain["Coords"])
+
+xf.writeMolecule(os.path.join(directory, name + ".lt"), ff + ".lt", name.upper(), xf.moltemplater(chain), chain, labels, chainBonds)
+xf.writeSystem(os.path.join(directory, "system.lt"), [name + ".lt"], [name.upper()], box)
@@ -0,0 +1,158 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to pack copies of molecules into a periodic
+# cubic box, for packToMoltemplate.py.
+#
+# Copies are placed in batches with random rotations and translations, all
+# computed as array operations. A copy is rejected if any of its atoms is
+# within the tolerance of an atom already placed, or of an earlier copy in the
+# same batch, and is tried again in the next batch. Placed atoms are kept
+# sorted by cell (cells at least the tolerance wide) so each check only looks
+# at the 27 neighbouring cells. Larger molecules are placed first.
+#
+# This file requires the libraries xyzFunctions.py and Dreiding_rules.py
+##############################################################################
+
+# Import packages
+import numpy as np
+import xyzFunctions as xf
+import Dreiding_rules as dr
+
+# Smallest distance (Angstroms) between atoms of different copies. Random
+# placement jams well below liquid density at 2.0, 1.6 reaches it for small
+# organic molecules and water
+PACK_TOLERANCE = 1.6
+
+# Smallest number of copies tried together
+PACK_BATCH = 2000
+
+# Packing fails when fewer than MIN_ACCEPTANCE of the copies tried are
+# accepted for MAX_FAILED_BATCHES batches in a row, as the box is then jammed
+MIN_ACCEPTANCE = 0.001
+MAX_FAILED_BATCHES = 5
+
+# Atomic mass unit in grams per cubic centimetre times cubic Angstroms
+AMU_DENSITY = 1.66054
+
+# Return the mass (amu) of a molecule from its element codes (from readXYZ)
+def moleculeMass(elementCodes):
+    masses = np.array(list(xf.atomDictionary.values()))
+
+    return masses[elementCodes].sum()
+
+# Return the side of the cubic box (Angstroms) that gives the density (g/cm^3)
+# for copies of molecules with the given total masses (amu)
+def boxSize(masses, counts, density):
+    return (np.dot(masses, counts) * AMU_DENSITY / density) ** (1 / 3)
+
+# Return n uniformly random rotation matrices as an (n, 3, 3) array, from
+# random unit quaternions
+def randomRotations(n, rng):
+    quaternions = rng.normal(size=(n, 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1)[:, None]
+    w, x, y, z = quaternions.T
+
+    return np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y),
+                     2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x),
+                     2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)), axis=1).reshape(n, 3, 3)
+
+# Cell index of each atom in a periodic cubic box of nCells cells a side
+def cellIndex(coords, box, nCells):
+    cells = np.floor(coords / box * nCells).astype(np.int64) % nCells
+
+    return np.ravel_multi_index(cells.T, (nCells,) * 3)
+
+# Sort atoms by cell. Returns the order and the position in that order where
+# each cell starts (with the end of the last cell appended).
+def sortCells(coords, box, nCells):
+    cellIDs = cellIndex(coords, box, nCells)
+    cellStarts = np.zeros(nCells ** 3 + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cellIDs, minlength=nCells ** 3), out=cellStarts[1:])
+
+    return np.argsort(cellIDs, kind='stable'), cellStarts
+
+# Return pairs (i, j) of atoms i of coords within tolerance of atoms j of
+# placedCoords in a periodic cubic box, with the placed atoms sorted by cell
+# (from sortCells)
+def closePairs(coords, placedCoords, placedOrder, cellStarts, box, nCells, tolerance):
+    cells = np.floor(coords / box * nCells).astype(np.int64) % nCells
+    pairsI = []
+    pairsJ = []
+    for offset in np.ndindex(3, 3, 3):
+        neighbourIDs = np.ravel_multi_index(((cells + np.array(offset) - 1) % nCells).T, (nCells,) * 3)
+        atomsI, positions = dr.expandRanges(cellStarts[neighbourIDs], cellStarts[neighbourIDs + 1])
+        atomsJ = placedOrder[positions]
+
+        # Minimum image separation
+        separation = coords[atomsI] - placedCoords[atomsJ]
+        separation -= box * np.round(separation / box)
+        close = (separation ** 2).sum(axis=1) < tolerance ** 2
+        pairsI.append(atomsI[close])
+        pairsJ.append(atomsJ[close])
+
+    return np.concatenate(pairsI), np.concatenate(pairsJ)
+
+# Pack counts copies of each molecule (a list of (K, 3) coordinate arrays) into
+# a periodic cubic box of side box. Returns a list of (count, K, 3) arrays of
+# the coordinates of every copy of each molecule.
+def packMolecules(molecules, counts, box, tolerance=PACK_TOLERANCE, seed=None):
+    rng = np.random.default_rng(seed)
+    nCells = max(1, int(box // tolerance))
+    placedCoords = np.empty((0, 3))
+    placedOrder, cellStarts = sortCells(placedCoords, box, nCells)
+
+    packed = [None] * len(molecules)
+    for index in sorted(range(len(molecules)), key=lambda index: -len(molecules[index])):
+        centred = molecules[index] - molecules[index].mean(axis=0)
+        nAtoms = len(centred)
+        copies = [np.empty((0, nAtoms, 3))]
+        placed = 0
+        failedBatches = 0
+        while placed < counts[index]:
+            assert(failedBatches < MAX_FAILED_BATCHES), "Only {} of {} copies of molecule {} could be packed, the box is jammed: lower the density or tolerance".format(placed, counts[index], index + 1)
+
+            # Randomly rotated and translated copies, at least PACK_BATCH so that
+            # the last gaps are still found near full density
+            batch = max(counts[index] - placed, PACK_BATCH)
+            trial = np.einsum('kj,bij->bki', centred, randomRotations(batch, rng)) + rng.random((batch, 1, 3)) * box
+
+            # Reject copies close to placed atoms
+            rejected = np.zeros(batch, dtype=bool)
+            atomsI, atomsJ = closePairs(trial.reshape(-1, 3), placedCoords, placedOrder, cellStarts, box, nCells, tolerance)
+            rejected[atomsI // nAtoms] = True
+
+            # Of the rest, reject the later copy of each close pair in the batch
+            survivors = trial[~rejected]
+            survivorAtoms = survivors.reshape(-1, 3)
+            survivorOrder, survivorStarts = sortCells(survivorAtoms, box, nCells)
+            atomsI, atomsJ = closePairs(survivorAtoms, survivorAtoms, survivorOrder, survivorStarts, box, nCells, tolerance)
+            copyI = atomsI // nAtoms
+            copyJ = atomsJ // nAtoms
+            clashes = np.zeros(len(survivors), dtype=bool)
+            clashes[np.maximum(copyI, copyJ)[copyI != copyJ]] = True
+
+            accepted = survivors[~clashes]
+            failedBatches = failedBatches + 1 if len(accepted) < MIN_ACCEPTANCE * batch else 0
+            accepted = accepted[:counts[index] - placed]
+            copies.append(accepted)
+            placed += len(accepted)
+
+            # Add the accepted atoms to the cell sorted placed atoms
+            placedCoords = np.concatenate((placedCoords, accepted.reshape(-1, 3)))
+            placedOrder, cellStarts = sortCells(placedCoords, box, nCells)
+
+        packed[index] = np.concatenate(copies)
+
+    return packed
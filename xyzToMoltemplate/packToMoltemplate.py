@@ -0,0 +1,71 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file packs copies of one or more molecules from .xyz files into a cubic
+# cell at a target density, e.g. a liquid or a blend, and writes moltemplate
+# .lt files for it. Each molecule gets its own 'molecule'.lt as from
+# xyzToMoltemplate.py, and system.lt makes every copy, with the packed
+# coordinates in 'system'.raw for moltemplate.sh -raw.
+#
+# Argument 1 is the directory of the .xyz files, where the output is written.
+# Argument 2 is the system name e.g. 'mixture'. Argument 3 is the density in
+# g/cm^3 e.g. '0.8'. Argument 4 is forcefield name without file extension
+# e.g. 'dreiding'. Further arguments are .xyz file names without extension,
+# each followed by its number of copies e.g. 'methanol 1000 water 500', and
+# options:
+#   type, charges, radii - as in xyzToMoltemplate.py, for each molecule
+#   tolerance=X - smallest distance between atoms of different copies in
+#                 angstroms (default: packFunctions.PACK_TOLERANCE)
+#   seed=N - seed of the random rotations and translations
+#
+# This file requires the libraries xyzFunctions.py and packFunctions.py
+##############################################################################
+
+# Import packages
+import os
+import sys
+import numpy as np
+import xyzFunctions as xf
+import packFunctions as pf
+
+directory = sys.argv[1]
+name = sys.argv[2]
+density = float(sys.argv[3])
+ff = sys.argv[4]
+options = [option for option in sys.argv[5:] if option in ("type", "charges", "radii") or "=" in option]
+moleculeArgs = [word for word in sys.argv[5:] if word not in options]
+settings = dict(option.split("=") for option in options if "=" in option)
+tolerance = float(settings.get("tolerance", pf.PACK_TOLERANCE))
+seed = int(settings["seed"]) if "seed" in settings else None
+
+moleculeNames = moleculeArgs[0::2]
+counts = [int(count) for count in moleculeArgs[1::2]]
+assert(len(moleculeNames) == len(counts) and len(counts) > 0), "Give each molecule name followed by its number of copies"
+
+# Read each molecule, with its bonds found in isolation
+molecules = [xf.prepareXYZ(os.path.join(directory, moleculeName + ".xyz"), None, options) for moleculeName in moleculeNames]
+
+# Cubic cell at the target density
+masses = [pf.moleculeMass(atoms["Elements"]) for atoms, labels, bondData, bonds in molecules]
+box = pf.boxSize(masses, counts, density)
+packed = pf.packMolecules([atoms["Coords"] for atoms, labels, bondData, bonds in molecules], counts, box, tolerance, seed)
+
+# One molecule .lt each, written in the order of system.lt
+forcefield = ff + ".lt"
+for moleculeName, (atoms, labels, bondData, bonds) in zip(moleculeNames, molecules):
+    xf.writeMolecule(os.path.join(directory, moleculeName + ".lt"), forcefield, moleculeName.upper(), xf.moltemplater(atoms), atoms, labels, bonds)
+
+xf.writeRaw(os.path.join(directory, name + ".raw"), np.concatenate([coords.reshape(-1, 3) for coords in packed]))
+xf.writeSystem(os.path.join(directory, "system.lt"), [moleculeName + ".lt" for moleculeName in moleculeNames],
+               [moleculeName.upper() for moleculeName in moleculeNames], "%f" % box, counts, name + ".raw")
@@ -0,0 +1,150 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to assign partial charges to atoms by charge
+# equilibration (QEq, Rappe and Goddard, J. Phys. Chem., 1991). It is used by
+# xyzFunctions.convertXYZ with the 'charges' option so the charges are written
+# straight to the Data Atoms block.
+#
+# Charges minimise sum(chi_i q_i) + 1/2 sum(J_i q_i^2) + sum(J_ij q_i q_j) with
+# a fixed total charge. The Coulomb interaction J_ij is shielded at short range
+# (Klopman-Ohno form) and smoothly tapered to zero at QEQ_CUTOFF, so the matrix
+# is sparse: only pairs within the cutoff (found with the cell list in
+# xyzFunctions.py) are stored. Periodic boxes narrower than twice the cutoff
+# are repeated into a supercell that is wide enough, so every periodic image
+# within the cutoff is included, including images of the atom itself. The two
+# linear systems are solved with the Jacobi preconditioned conjugate gradient
+# method, using only sparse matrix vector products, so memory and time grow
+# linearly with the number of atoms.
+# The charge dependent hydrogen hardness of the original method is not used.
+#
+# This file requires the library xyzFunctions.py
+##############################################################################
+
+# Import packages
+import numpy as np
+import xyzFunctions as xf
+
+# QEq electronegativity (chi) and hardness (J) in eV from Rappe and Goddard (1991)
+qeqParameters = {
+    "H": [4.528, 13.890],
+    "C": [5.343, 10.126],
+    "N": [6.899, 11.760],
+    "O": [8.741, 13.364],
+    "F": [10.874, 14.948],
+    "Na": [2.843, 4.592],
+    "Si": [4.168, 6.974],
+    "P": [5.463, 8.000],
+    "S": [6.928, 8.972],
+    "Cl": [8.564, 9.892],
+    "Br": [7.790, 8.850],
+    "I": [6.822, 7.524],
+}
+
+# Coulomb constant in eV Angstrom
+COULOMB = 14.4
+
+# Distance (Angstroms) at which the shielded Coulomb interaction reaches zero
+QEQ_CUTOFF = 10.0
+
+# Seventh order taper that goes smoothly from 1 at r = 0 to 0 at r = cutoff
+def taper(r, cutoff):
+    x = r / cutoff
+
+    return 20 * x**7 - 70 * x**6 + 84 * x**5 - 35 * x**4 + 1
+
+# Solve A x = b with the Jacobi preconditioned conjugate gradient method, where
+# A is symmetric positive definite and given by its matrix vector product
+def conjugateGradient(matvec, diagonal, b, tolerance=1e-10, maxIterations=1000):
+    x = np.zeros(len(b))
+    residual = b.copy()
+    z = residual / diagonal
+    direction = z.copy()
+    rz = residual @ z
+    target = tolerance * np.linalg.norm(b)
+
+    for iteration in range(maxIterations):
+        if np.linalg.norm(residual) <= target:
+            return x
+        product = matvec(direction)
+        step = rz / (direction @ product)
+        x += step * direction
+        residual -= step * product
+        z = residual / diagonal
+        rzNew = residual @ z
+        direction = z + (rzNew / rz) * direction
+        rz = rzNew
+
+    assert(np.linalg.norm(residual) <= target), "QEq didn't converge in {} iterations".format(maxIterations)
+
+    return x
+
+# Return each interaction (row, column, distance) within cutoff of a system,
+# in both directions. In a periodic box columns are the atoms of every image
+# within the cutoff, so a row can have the same column more than once.
+def interactionPairs(coords, cutoff, box=None):
+    if box is None:
+        pairsI, pairsJ, distances = xf.neighbourPairs(coords, cutoff)
+        return np.concatenate((pairsI, pairsJ)), np.concatenate((pairsJ, pairsI)), np.concatenate((distances, distances))
+
+    box = np.asarray(box, dtype=float)
+    if box.ndim == 1:
+        box = np.diag(box)
+
+    # Repeat the box until every width is at least twice the cutoff
+    volume = abs(np.linalg.det(box))
+    widths = volume / np.linalg.norm(np.cross(box[[1, 2, 0]], box[[2, 0, 1]]), axis=1)
+    repeats = np.maximum(np.ceil(2 * cutoff / widths).astype(np.int64), 1)
+    shifts = np.array(list(np.ndindex(*repeats))) @ box
+    supercell = (coords[None, :, :] + shifts[:, None, :]).reshape(-1, 3)
+    pairsI, pairsJ, distances = xf.neighbourPairs(supercell, cutoff, box * repeats[:, None])
+
+    # Keep interactions from atoms of the original box, the first image
+    nAtoms = len(coords)
+    rows = np.concatenate((pairsI, pairsJ))
+    columns = np.concatenate((pairsJ, pairsI))
+    distances = np.concatenate((distances, distances))
+    original = rows < nAtoms
+
+    return rows[original], columns[original] % nAtoms, distances[original]
+
+# Return the QEq charges of a system. elements is an array of element symbols
+# and coords an (N, 3) array. box makes the interactions periodic, see
+# xyzFunctions.neighbourPairs; it can be narrower than twice the cutoff.
+def qeqCharges(elements, coords, box=None, totalCharge=0.0, cutoff=QEQ_CUTOFF):
+    elements = np.asarray(elements)
+    unknownElements = set(elements).difference(qeqParameters)
+    assert(len(unknownElements) == 0), "No QEq parameters for elements: {}".format(unknownElements)
+
+    symbols, elementCodes = np.unique(elements, return_inverse=True)
+    parameters = np.array([qeqParameters[symbol] for symbol in symbols])[elementCodes]
+    chi = parameters[:, 0]
+    hardness = parameters[:, 1]
+
+    # Sparse shielded Coulomb matrix as interactions within the cutoff
+    rows, columns, distances = interactionPairs(np.asarray(coords, dtype=float), cutoff, box)
+    pairHardness = (hardness[rows] + hardness[columns]) / 2
+    coulomb = COULOMB / np.sqrt(distances**2 + (COULOMB / pairHardness)**2) * taper(distances, cutoff)
+
+    def matvec(vector):
+        product = hardness * vector
+        product += np.bincount(rows, weights=coulomb * vector[columns], minlength=len(vector))
+        return product
+
+    # Charges are s - mu t where mu, the equalised electronegativity, sets the total charge
+    s = conjugateGradient(matvec, hardness, -chi)
+    t = conjugateGradient(matvec, hardness, -np.ones(len(chi)))
+    mu = (s.sum() - totalCharge) / t.sum()
+
+    return s - mu * t
@@ -1,3 +1,3 @@
 #!/bin/bash
 dir=$PWD
-python3 /home/matt/Documents/Python/xyzToMoltemplate.py $dir $1 $2 $3
+python3 /home/matt/Documents/Python/xyzToMoltemplate.py $dir $@
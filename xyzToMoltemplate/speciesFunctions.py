@@ -0,0 +1,252 @@
+##############################################################################
+# Developed by: Matthew Bone
+# Last Updated: 18/10/2026
+# Updated by: Matthew Bone
+#
+# Contact Details:
+# Bristol Composites Institute (BCI)
+# Department of Aerospace Engineering - University of Bristol
+# Queen's Building - University Walk
+# Bristol, BS8 1TR
+# U.K.
+# Email - matthew.bone@bristol.ac.uk
+#
+# File Description:
+# This file contains functions to split a system (e.g. a packed liquid box)
+# into its molecules and group identical molecules into species. It is used by
+# xyzFunctions.convertXYZ with the 'split' option, so each species is written
+# as one molecule .lt and instanced many times in system.lt.
+#
+# Molecules are the connected components of the bond graph. Each atom is given
+# a colour from its label (or element) and its neighbourhood by colour
+# refinement (Weisfeiler-Lehman), and molecules with the same size, bond count
+# and colours are candidates for the same species. Candidates are then matched
+# atom by atom to the first molecule of the species, the template: directly if
+# their atoms are in the same order (as from most packing tools), otherwise by
+# refining the colours of both molecules together and individualising tied
+# atoms. Every match is checked bond by bond, so molecules that only share
+# colours become new species.
+#
+# This file requires the libraries xyzFunctions.py and Dreiding_rules.py
+##############################################################################
+
+# Import packages
+import os
+import numpy as np
+import xyzFunctions as xf
+import Dreiding_rules as dr
+
+# Colour refinement iterations used to group candidate molecules
+HASH_ITERATIONS = 4
+
+# Return the molecule (connected component) of each atom. Molecules are
+# numbered in order of their first atom.
+def connectedComponents(nAtoms, bonds):
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    labels = np.arange(nAtoms)
+
+    # Each atom takes the lowest label of its neighbours until nothing changes
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, bonds[:, 0], labels[bonds[:, 1]])
+        np.minimum.at(labels, bonds[:, 1], labels[bonds[:, 0]])
+
+        # Labels are atoms of the same molecule, so jump to the label's label
+        jumped = labels[labels]
+        while not np.array_equal(jumped, labels):
+            labels = jumped
+            jumped = labels[labels]
+
+        if np.array_equal(labels, previous):
+            break
+
+    return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+# Refine atom colours by their sorted neighbour colours, for the given number
+# of iterations or until no colour class splits. Returns colours numbered from 0.
+def refineColours(colours, indptr, neighbours, iterations=None):
+    nAtoms = len(colours)
+    colours = np.unique(colours, return_inverse=True)[1].reshape(-1)
+    degree = np.diff(indptr)
+    maxDegree = degree.max() if nAtoms > 0 else 0
+    atomIDs = np.repeat(np.arange(nAtoms), degree)
+    slots = np.arange(len(neighbours)) - indptr[atomIDs]
+
+    iteration = 0
+    while iterations is None or iteration < iterations:
+        iteration += 1
+
+        # Each atom's colour followed by its neighbours' colours in ascending order
+        rows = np.full((nAtoms, maxDegree + 1), -1, dtype=np.int64)
+        rows[:, 0] = colours
+        order = np.lexsort((colours[neighbours], atomIDs))
+        rows[atomIDs, slots + 1] = colours[neighbours[order]]
+
+        newColours = np.unique(rows, axis=0, return_inverse=True)[1].reshape(-1)
+        stable = newColours.max() == colours.max()
+        colours = newColours
+        if stable:
+            break
+
+    return colours
+
+# Find the order of instance atoms that matches each template atom, from the
+# codes and local bonds of both molecules. Returns None if they don't match.
+def matchAtoms(templateCodes, templateBonds, instanceCodes, instanceBonds):
+    nAtoms = len(templateCodes)
+    indptr, neighbours, bondIDs = dr.adjacency(2 * nAtoms, np.concatenate((templateBonds, instanceBonds + nAtoms)))
+    templateKeys = np.sort(templateBonds.min(axis=1) * nAtoms + templateBonds.max(axis=1))
+
+    def search(colours):
+        colours = refineColours(colours, indptr, neighbours)
+        templateColours = colours[:nAtoms]
+        instanceColours = colours[nAtoms:]
+        if not np.array_equal(np.sort(templateColours), np.sort(instanceColours)):
+            return None
+
+        # Individualise the first template atom of the lowest tied colour with
+        # each instance atom of that colour in turn
+        counts = np.bincount(templateColours)
+        tied = np.flatnonzero(counts > 1)
+        if len(tied) > 0:
+            templateAtom = np.flatnonzero(templateColours == tied[0])[0]
+            for instanceAtom in np.flatnonzero(instanceColours == tied[0]):
+                trial = colours.copy()
+                trial[[templateAtom, nAtoms + instanceAtom]] = colours.max() + 1
+                match = search(trial)
+                if match is not None:
+                    return match
+            return None
+
+        # Colours are unique, so check the bonds of the colour matching
+        match = np.argsort(instanceColours)[templateColours]
+        templateIndex = np.empty(nAtoms, dtype=np.int64)
+        templateIndex[match] = np.arange(nAtoms)
+        mappedBonds = templateIndex[instanceBonds]
+        mappedKeys = np.sort(mappedBonds.min(axis=1) * nAtoms + mappedBonds.max(axis=1))
+
+        return match if np.array_equal(mappedKeys, templateKeys) else None
+
+    return search(np.concatenate((templateCodes, instanceCodes)))
+
+# Split molecules of the same size and candidate colours (members, an (M, K)
+# array of atom indices in atom order) into species
+def matchMolecules(members, codes, localBonds):
+    nAtoms = members.shape[1]
+    bondKeys = np.sort(localBonds.min(axis=2) * nAtoms + localBonds.max(axis=2), axis=1)
+
+    species = []
+    pending = np.arange(len(members))
+    while len(pending) > 0:
+        template = pending[0]
+
+        # Molecules with their atoms in the same order as the template
+        sameOrder = (codes[members[pending]] == codes[members[template]]).all(axis=1) & (bondKeys[pending] == bondKeys[template]).all(axis=1)
+        instances = [members[pending[sameOrder]]]
+
+        # Match the rest atom by atom
+        unmatched = []
+        for molecule in pending[~sameOrder]:
+            match = matchAtoms(codes[members[template]], localBonds[template], codes[members[molecule]], localBonds[molecule])
+            if match is None:
+                unmatched.append(molecule)
+            else:
+                instances.append(members[molecule][match][None, :])
+
+        species.append(np.concatenate(instances))
+        pending = np.array(unmatched, dtype=np.int64)
+
+    return species
+
+# Split a system into species of identical molecules. codes are the label (or
+# element) code of each atom and bonds an (N, 2) array. Returns a list of
+# (M, K) arrays of atom indices, one row per molecule with its atoms in the
+# order of the first molecule (the template), in order of first appearance.
+def findSpecies(codes, bonds):
+    codes = np.asarray(codes, dtype=np.int64)
+    nAtoms = len(codes)
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    molecules = connectedComponents(nAtoms, bonds)
+    indptr, neighbours, bondIDs = dr.adjacency(nAtoms, bonds)
+    colours = refineColours(codes, indptr, neighbours, HASH_ITERATIONS)
+
+    # Atoms of each molecule in atom order, and their position in it
+    atomOrder = np.argsort(molecules, kind='stable')
+    sizes = np.bincount(molecules)
+    starts = np.cumsum(sizes) - sizes
+    localIndex = np.empty(nAtoms, dtype=np.int64)
+    localIndex[atomOrder] = np.arange(nAtoms) - starts[molecules[atomOrder]]
+
+    # Bonds of each molecule in local indices
+    bondMolecules = molecules[bonds[:, 0]]
+    bondOrder = np.argsort(bondMolecules, kind='stable')
+    bondCounts = np.bincount(bondMolecules, minlength=len(sizes))
+    bondStarts = np.cumsum(bondCounts) - bondCounts
+
+    species = []
+    for size, bondCount in np.unique(np.column_stack((sizes, bondCounts)), axis=0):
+        candidates = np.flatnonzero((sizes == size) & (bondCounts == bondCount))
+        members = atomOrder[starts[candidates][:, None] + np.arange(size)]
+        localBonds = localIndex[bonds[bondOrder[bondStarts[candidates][:, None] + np.arange(bondCount)]]].reshape(len(candidates), bondCount, 2)
+
+        # Group molecules with the same colours
+        keys = np.sort(colours[members], axis=1)
+        groups = np.unique(keys, axis=0, return_inverse=True)[1].reshape(-1)
+        for group in np.unique(groups):
+            species += matchMolecules(members[groups == group], codes, localBonds[groups == group])
+
+    # Species in order of their first atom
+    species.sort(key=lambda instances: instances[0].min())
+
+    return species
+
+# Return the Hill formula of a list of element symbols, e.g. CH4O
+def hillFormula(elements):
+    symbols, counts = np.unique(elements, return_counts=True)
+    counts = dict(zip(symbols, counts))
+    order = ["C", "H"] + sorted(symbol for symbol in counts if symbol not in ("C", "H")) if "C" in counts else sorted(counts)
+
+    return ''.join(symbol + (str(counts[symbol]) if counts[symbol] > 1 else '') for symbol in order if symbol in counts)
+
+# Write one molecule .lt per species and a system.lt that makes every molecule
+# from them, with the molecule coordinates in 'name'.raw. atoms and labels are
+# as in convertXYZ. The charges of each template atom are the mean over the
+# molecules of the species.
+def writeSpecies(outputDirectory, name, forcefield, atoms, labels, bonds, box):
+    codes = atoms["Elements"] if labels is None else np.unique(labels, return_inverse=True)[1].reshape(-1)
+    species = findSpecies(codes, bonds)
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    elements = xf.elementSymbols[atoms["Elements"]]
+
+    moleculeFiles = []
+    molecules = []
+    counts = []
+    formulae = {}
+    for instances in species:
+        template = instances[0]
+
+        # Species are named by formula, numbered if isomers share one
+        formula = hillFormula(elements[template])
+        formulae[formula] = formulae.get(formula, 0) + 1
+        speciesName = name + "_" + formula + ("_" + str(formulae[formula]) if formulae[formula] > 1 else "")
+
+        # Template atoms and the bonds between them in template order
+        localIndex = np.full(len(codes), -1, dtype=np.int64)
+        localIndex[template] = np.arange(len(template))
+        templateBonds = localIndex[bonds[(localIndex[bonds] >= 0).all(axis=1)]]
+        templateAtoms = {
+            "Elements": atoms["Elements"][template],
+            "Coords": atoms["Coords"][template],
+            "Charges": atoms["Charges"][instances].mean(axis=0),
+        }
+        templateLabels = None if labels is None else labels[template]
+
+        xf.writeMolecule(os.path.join(outputDirectory, speciesName + ".lt"), forcefield, speciesName.upper(), xf.moltemplater(templateAtoms),
+                         templateAtoms, templateLabels, templateBonds)
+        moleculeFiles.append(speciesName + ".lt")
+        molecules.append(speciesName.upper())
+        counts.append(len(instances))
+
+    # Coordinates in the order moltemplate makes the atoms
+    xf.writeRaw(os.path.join(outputDirectory, name + ".raw"), atoms["Coords"][np.concatenate([instances.reshape(-1) for instances in species])])
+    xf.writeSystem(os.path.join(outputDirectory, "system.lt"), moleculeFiles, molecules, box, counts, name + ".raw")
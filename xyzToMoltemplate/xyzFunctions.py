@@ -1,6 +1,6 @@
 ##############################################################################
 # Developed by: Matthew Bone
-# Last Updated: 08/10/2020
+# Last Updated: 18/10/2026
 # Updated by: Matthew Bone
 #
 # Contact Details:
@@ -15,12 +15,20 @@
 # This file contains functions to manipulate .xyz files and produce moltemplate
 # .lt files. It is typically used with xyzToMoltemplate.py. The atom dictionary
 # can be updated to included more atoms and masses.
+#
+# The DREIDING label dictionary is imported from the repository root, which is
+# added to the python path; if these files are copied elsewhere the Dreiding_*.py
+# files need to be copied with them.
 ##############################################################################
 
 # Import packages
-import math
+import os
+import sys
+import itertools
 import numpy as np
-import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Dreiding_label_dictionary import labelDict
 
 # Dictionary of relative atomic mass
 # Values taken from https://www.rsc.org/periodic-table
@@ -59,63 +67,409 @@ atomDictionary = {
     "I": 126.904,
 }
 
-# Import xyz file and store as pd.DataFrame
-def xyzToDF(filename):
-    # Import xyz file using np
-    atomData = np.genfromtxt(filename, delimiter=None, dtype=[("Element", '<U32'),
-     ("X", float), ("Y", float), ("Z", float)], skip_header=2, encoding="UTF8")
-    # Convert to pd dataframe
-    atomData = pd.DataFrame(atomData)
+# Largest DREIDING bond radius (labelDict index [1]) of each element, used for
+# per-element bond cutoffs. Element is the label text before the first flag.
+bondRadii = {}
+for label, value in labelDict.items():
+    element = label.split("_")[0]
+    bondRadii[element] = max(bondRadii.get(element, 0.0), value[1])
+
+# Distance added to the sum of bond radii when using per-element cutoffs
+BOND_TOLERANCE = 0.4
+
+# Element symbols and DREIDING labels in dictionary order. Atoms store their
+# element and label as int codes that index these arrays.
+elementSymbols = np.array(list(atomDictionary.keys()))
+labelNames = np.array(list(labelDict.keys()))
+
+# Return element codes and label codes (None unless every symbol is a DREIDING
+# label) of an array of distinct atom symbols
+def symbolCodes(symbols):
+    if all(symbol in labelDict for symbol in symbols):
+        labelCodes = np.array([list(labelDict).index(symbol) for symbol in symbols], dtype=np.int16)
+        # Element is the label text before the first flag e.g. C_R1 -> C, H_HB -> H
+        symbols = [symbol.split("_")[0] for symbol in symbols]
+    else:
+        labelCodes = None
+
+    # Error and return unmatched elements
+    differentElements = set(symbols).difference(atomDictionary)
+    assert(len(differentElements) == 0), "File contains unknown elements: {}".format(differentElements)
+    elementCodes = np.array([list(atomDictionary).index(symbol) for symbol in symbols], dtype=np.int16)
+
+    return elementCodes, labelCodes
+
+# Read an xyz file one frame at a time. Each frame is read from the atom count
+# in its header, so memory only depends on the size of a frame and multi-frame
+# (trajectory) files of any length can be read. Columns after the coordinates
+# are ignored. Yields a dictionary of arrays, one entry per atom: "Elements"
+# element codes, "Labels" label codes (None unless DREIDING labels are given in
+# place of element symbols, a labelled .xyz), "Coords" (N, 3) coordinates and
+# "Charges" zero charges.
+def readFrames(filename):
+    with open(filename, 'rb') as file:
+        while True:
+            header = file.readline()
+            if header.strip() == b'':
+                break
+            nAtoms = int(header)
+            file.readline() # Comment line
+
+            frame = b''.join(itertools.islice(file, nAtoms))
+            tokens = frame.split()
+            if len(tokens) != 4 * nAtoms:
+                tokens = [token for line in frame.splitlines() for token in line.split()[:4]]
+            assert(len(tokens) == 4 * nAtoms), "Frame of {} is shorter than its {} atoms".format(filename, nAtoms)
+            tokens = np.array(tokens).reshape(nAtoms, 4)
+
+            # Each distinct symbol is only looked up once
+            symbols, atomSymbols = np.unique(tokens[:, 0], return_inverse=True)
+            elementCodes, labelCodes = symbolCodes([symbol.decode() for symbol in symbols])
+
+            yield {
+                "Elements": elementCodes[atomSymbols],
+                "Labels": None if labelCodes is None else labelCodes[atomSymbols],
+                "Coords": tokens[:, 1:].astype(float),
+                "Charges": np.zeros(nAtoms),
+            }
+
+# Import the first frame of an xyz file, see readFrames
+def readXYZ(filename):
+    return next(readFrames(filename))
+
+# Find all pairs of atoms within cutoff of each other using a cell list.
+# Atoms are sorted into cells with sides of at least cutoff, so each atom only
+# needs to be compared with atoms in its own and the 26 neighbouring cells.
+# Each pair of cells is only checked once by looking at the cell itself and
+# half of its neighbours. Returns arrays of i < j atom indices and distances.
+#
+# If a box is given, distances use the minimum image convention. box is either
+# three lengths of an orthorhombic box or a 3x3 matrix whose rows are the box
+# vectors a, b, c of a triclinic box (LAMMPS style a = (lx, 0, 0),
+# b = (xy, ly, 0), c = (xz, yz, lz)). Every box width must be at least twice
+# the cutoff so that each pair has one minimum image.
+def neighbourPairs(coords, cutoff, box=None):
+    nAtoms = len(coords)
+    if nAtoms < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    if box is None:
+        # Cells of each atom from the lowest coordinates
+        cells = np.floor((coords - coords.min(axis=0)) / cutoff).astype(np.int64)
+        nCells = cells.max(axis=0) + 1
+    else:
+        box = np.asarray(box, dtype=float)
+        if box.ndim == 1:
+            box = np.diag(box)
+
+        # Perpendicular width of the box along each box vector
+        volume = abs(np.linalg.det(box))
+        widths = volume / np.linalg.norm(np.cross(box[[1, 2, 0]], box[[2, 0, 1]]), axis=1)
+        assert((widths >= 2 * cutoff).all()), "Box widths {} must be at least twice the cutoff {}".format(widths, cutoff)
 
-    return atomData
+        # Wrapped fractional coordinates and periodic cells
+        fractional = coords @ np.linalg.inv(box)
+        fractional -= np.floor(fractional)
+        nCells = np.floor(widths / cutoff).astype(np.int64)
+        cells = np.minimum(np.floor(fractional * nCells).astype(np.int64), nCells - 1)
 
-# Determine what atoms are bonded by looking at bonding distance
-def bondCalculation(atomData):
-    # Preload list for storing bond data
-    bondData = []
+    cellIDs = np.ravel_multi_index(cells.T, nCells)
+    atomOrder = np.argsort(cellIDs, kind='stable')
+    sortedCellIDs = cellIDs[atomOrder]
+
+    # Half of the 26 neighbouring cells plus the cell itself
+    offsets = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1) if (x, y, z) > (0, 0, 0)]
+    offsets.insert(0, (0, 0, 0))
+
+    pairsI = []
+    pairsJ = []
+    distances = []
+    for offset in offsets:
+        neighbourCells = cells + offset
+        if box is None:
+            inside = ((neighbourCells >= 0) & (neighbourCells < nCells)).all(axis=1)
+        else:
+            # Neighbouring cells wrap around the periodic box
+            neighbourCells %= nCells
+            inside = np.ones(nAtoms, dtype=bool)
+        atomsI = np.flatnonzero(inside)
+        neighbourIDs = np.ravel_multi_index(neighbourCells[inside].T, nCells)
+
+        # Range of sorted atoms in each neighbouring cell
+        start = np.searchsorted(sortedCellIDs, neighbourIDs, side='left')
+        counts = np.searchsorted(sortedCellIDs, neighbourIDs, side='right') - start
+        total = counts.sum()
+        if total == 0:
+            continue
+
+        # Expand every atom i into one candidate pair per atom j in the neighbouring cell
+        candidateI = np.repeat(atomsI, counts)
+        steps = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidateJ = atomOrder[np.repeat(start, counts) + steps]
+
+        # Atoms in their own cell are only paired once
+        if offset == (0, 0, 0):
+            keep = candidateI < candidateJ
+            candidateI = candidateI[keep]
+            candidateJ = candidateJ[keep]
+
+        # Only keep pairs within the cutoff, so memory grows with the number of pairs
+        if box is None:
+            candidateDistances = np.linalg.norm(coords[candidateI] - coords[candidateJ], axis=1)
+        else:
+            # Minimum image of the fractional separation
+            separation = fractional[candidateI] - fractional[candidateJ]
+            separation -= np.round(separation)
+            candidateDistances = np.linalg.norm(separation @ box, axis=1)
+        close = candidateDistances <= cutoff
+
+        pairsI.append(np.minimum(candidateI[close], candidateJ[close]))
+        pairsJ.append(np.maximum(candidateI[close], candidateJ[close]))
+        distances.append(candidateDistances[close])
+
+    if len(pairsI) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    pairsI = np.concatenate(pairsI)
+    pairsJ = np.concatenate(pairsJ)
+    distances = np.concatenate(distances)
+
+    # Periodic boxes with only two cells in a direction reach the same cell twice
+    if box is not None and (nCells < 3).any():
+        pairKeys, unique = np.unique(pairsI * nAtoms + pairsJ, return_index=True)
+        pairsI, pairsJ, distances = pairKeys // nAtoms, pairKeys % nAtoms, distances[unique]
+
+    return pairsI, pairsJ, distances
+
+# Determine what atoms are bonded by looking at bonding distance. By default
+# any atoms within cutoff are bonded. If tolerance is given each pair is bonded
+# within the sum of their element bond radii (from labelDict) plus tolerance.
+# box makes the search periodic, see neighbourPairs. atoms is from readXYZ.
+def bondCalculation(atoms, cutoff=1.6, box=None, tolerance=None):
+    coords = atoms["Coords"]
+    elements = elementSymbols[atoms["Elements"]]
+    isHydrogen = elements == 'H'
+
+    if tolerance is None:
+        # As structures are very ordered. Anything within 1.6 Ang is going to be a bonded atom
+        pairsI, pairsJ, distances = neighbourPairs(coords, cutoff, box)
+    else:
+        unknownElements = set(elements).difference(bondRadii)
+        assert(len(unknownElements) == 0), "No DREIDING bond radius for elements: {}".format(unknownElements)
+
+        # Search to the largest possible cutoff, then check each pair's own cutoff
+        radii = np.array([bondRadii[element] for element in elements])
+        pairsI, pairsJ, distances = neighbourPairs(coords, 2 * radii.max() + tolerance, box)
+        bonded = distances <= radii[pairsI] + radii[pairsJ] + tolerance
+        pairsI, pairsJ = pairsI[bonded], pairsJ[bonded]
+
+    # Store each bond in both directions, sorted by bonder then bondee
+    bonders = np.concatenate((pairsI, pairsJ))
+    bondees = np.concatenate((pairsJ, pairsI))
+    bondOrder = np.lexsort((bondees, bonders))
+    bondeeLists = np.split(bondees[bondOrder], np.cumsum(np.bincount(bonders, minlength=len(coords)))[:-1])
 
     # Create a list of tuples of (int, list) that contain the bonder (bondData[x][0]) and bondees (bondData[x][1][y])
-    for index1, row1 in atomData.iterrows():
-        if row1["Element"] == 'H':
-            continue # Prevents creating bonds with H as the bonder. Not needed as H can only ever have one bond
-        bondList = []
-        for index2, row2 in atomData.iterrows():
-            if index1 == index2:
-                continue # Stop bonder forming bonds with itself
-            bondLength = math.sqrt((row1["X"] - row2["X"])**2 + (row1["Y"] - row2["Y"])**2 + (row1["Z"] - row2["Z"])**2) # Calc bond length
-            if bondLength <= 1.6: # As structures are very ordered. Anything within 1.6 Ang is going to be a bonded atom
-                bondList.append(index2)
-        bondData.append((index1, bondList))
+    # H is never the bonder as H can only ever have one bond
+    bondData = [(index, bondeeLists[index].tolist()) for index in range(len(coords)) if not isHydrogen[index]]
 
     return bondData
 
+# Return an array of unique bonds from bondData. Every bond is kept once, in the
+# order and orientation (bonder, bondee) in which it is first found.
+def uniqueBonds(bondData):
+    # Preallocate an edge for every bonder - bondee entry
+    nEdges = sum(len(bondees) for bonder, bondees in bondData)
+    edges = np.empty((nEdges, 2), dtype=np.int64)
+    position = 0
+    for bonder, bondees in bondData:
+        edges[position:position + len(bondees), 0] = bonder
+        edges[position:position + len(bondees), 1] = bondees
+        position += len(bondees)
 
-# Add moletemplate jargon to column including element and element count
-def moltemplater(atomData, atomDictionary):
-    # Preload list for moltemplate atom names
-    atomName = []
+    # Same key for both orientations of a bond, keep the first edge with each key
+    nAtoms = edges.max() + 1 if nEdges > 0 else 0
+    keys = edges.min(axis=1) * nAtoms + edges.max(axis=1)
+    keys, firstEdges = np.unique(keys, return_index=True)
 
-    # Dataframe of elements and counters
-    countersDF = pd.DataFrame({"Counter": 0}, index = list(atomDictionary.keys()))
+    return edges[np.sort(firstEdges)]
 
-    # Check to see if there are elements in the file that don't match the database
-    incomingElements = set(list(atomData["Element"]))
-    databaseElements = set(list(atomDictionary.keys()))
-    differentElements = incomingElements.difference(databaseElements)
-
-    # Error and return unmatched elements
-    assert(len(incomingElements.intersection(databaseElements)) == len(incomingElements)), "File contains unknown elements: {}".format(differentElements)
 
-    # Loop through atomData
-    for index, row in atomData.iterrows():
-        # Find element symbol and add moltemplate syntax, element symbol and counter value to atomData
-        atom = row["Element"]
-        atomData.loc[index, "Element"] = "$atom:" + row["Element"] + str(countersDF.loc[atom, "Counter"])
+# Name each atom with its element symbol and a counter of that element, e.g.
+# C0, H0, H1. Counters for every element are found together by sorting the
+# atoms by element. Returns an array of atom names.
+def moltemplater(atoms):
+    elementCodes = atoms["Elements"]
 
-        # Add atom name to atomName list
-        atomName.append(atom + str(countersDF.loc[atom, "Counter"]))
+    # Position of each atom among the atoms of its element
+    atomOrder = np.argsort(elementCodes, kind='stable')
+    elementStarts = np.searchsorted(elementCodes[atomOrder], elementCodes[atomOrder], side='left')
+    counters = np.empty(len(elementCodes), dtype=np.int64)
+    counters[atomOrder] = np.arange(len(elementCodes)) - elementStarts
 
-        # Increase relevant counter by 1
-        countersDF.loc[atom] += 1
+    atomName = np.char.add(elementSymbols[elementCodes], counters.astype(str))
 
     return atomName
+
+# Write a readable list of bonds between atoms
+def writeBondList(filename, atomName, bondData):
+    with open(filename, 'w') as readableBonds:
+
+        for index, value1 in enumerate(bondData):
+            # Atom X ...
+            readableBonds.write("Atom: " + atomName[value1[0]] + "\n")
+            for value2 in bondData[index][1]:
+                # ... bonded with Atoms Y,Z, etc
+                readableBonds.write("Bonded with: " + atomName[value2] + "\n")
+            readableBonds.write("\n")
+
+# Write the molecule .lt file, built to the LAMMPS 'full' style.
+# labels is None for atoms that only have element symbols.
+def writeMolecule(filename, forcefield, molecule, atomName, atoms, labels, bonds):
+    # Set for LAMMPS 'full' style
+    dataStyle = " $mol:... @atom:"
+
+    with open(filename, 'w') as file:
+
+        # Begin molecule
+        file.write('import "' + forcefield + '" \n\n')
+        file.write(molecule + " inherits " + os.path.splitext(forcefield)[0].upper() + " {\n") # forcefield file must use uppercase function
+
+        # Write atom data
+        file.write('\twrite("Data Atoms") {\n')
+        atomTypes = [dataStyle] * len(atomName) if labels is None else np.char.add(dataStyle, labels)
+        file.write(''.join('\t\t $atom:%s %s %s %f %f %f\n' % (atomName[index], atomTypes[index], atoms["Charges"][index], *atoms["Coords"][index])
+                           for index in range(len(atomName))))
+        file.write('\n\t}\n')
+
+        # Write each bond once
+        file.write('\twrite("Data Bond List") {\n')
+        atomNames = np.array(atomName, dtype=object)
+        file.write(''.join('\t\t$bond:' + str(bondCounter) + '\t$atom:' + bonderName + '\t$atom:' + bondeeName + '\n'
+                           for bondCounter, (bonderName, bondeeName) in enumerate(zip(atomNames[bonds[:, 0]], atomNames[bonds[:, 1]]))))
+        file.write('\t}\n')
+
+        # Close molecule bracket and save file
+        file.write('}')
+
+# Write the system.lt file with molecules in a cubic cell of side box. By
+# default one of each molecule is made; counts gives the number of each and
+# rawFile the coordinates of every atom, to be given to moltemplate with -raw.
+# replicate repeats the cell replicate times along each axis (a supercell) and
+# can't be used with counts.
+def writeSystem(filename, moleculeFiles, molecules, box, counts=None, rawFile=None, replicate=1):
+    assert(replicate == 1 or counts is None), "replicate can't be used with molecule counts"
+    counts = [1] * len(molecules) if counts is None else counts
+    arrays = ["[" + str(count) + "]" for count in counts]
+    if replicate > 1:
+        # Copies of the cell along each axis
+        arrays = ["[{0}].move({1},0,0) [{0}].move(0,{1},0) [{0}].move(0,0,{1})".format(replicate, box)] * len(molecules)
+        box = str(float(box) * replicate)
+    instanceNames = ["molecule"] if len(molecules) == 1 else ["molecule" + str(index + 1) for index in range(len(molecules))]
+
+    with open(filename, "w") as system:
+
+        # Atom coordinates are replaced by those in rawFile
+        if rawFile is not None:
+            system.write("# Coordinates: moltemplate.sh -raw " + rawFile + " system.lt\n\n")
+
+        # General setup of atom and cubic cell
+        system.write(''.join('import "' + moleculeFile + '"\n' for moleculeFile in moleculeFiles) + '\n')
+        system.write(''.join(instanceName + " = new " + molecule + " " + array + "\n"
+                             for instanceName, molecule, array in zip(instanceNames, molecules, arrays)) + '\n')
+        system.write('write_once("Data Boundary") {\n')
+        system.write("\t0.0 " + box + " xlo xhi\n")
+        system.write("\t0.0 " + box + " ylo yhi\n")
+        system.write("\t0.0 " + box + " zlo zhi\n")
+        system.write("}\n\n")
+
+# Write atom coordinates as a moltemplate .raw file (x y z per line)
+def writeRaw(filename, coords):
+    np.savetxt(filename, coords, fmt='%f')
+
+# Return the path of a forcefield .lt file: next to the .xyz file, otherwise in
+# the repository root
+def forcefieldPath(xyzFile, forcefield):
+    path = os.path.join(os.path.dirname(os.path.abspath(xyzFile)), forcefield)
+    if not os.path.exists(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", forcefield)
+
+    return path
+
+# Read an .xyz file and find its bonds, and its labels and charges if the
+# options ask for them (see convertXYZ). Returns the atoms (from readXYZ), the
+# labels (None for element symbols), bondData and the unique bonds.
+def prepareXYZ(xyzFile, box, options):
+    # Import xyz file as arrays of element codes, label codes, coordinates and charges
+    atoms = readXYZ(xyzFile)
+
+    # Labelled .xyz files give DREIDING labels in place of element symbols
+    labels = None if atoms["Labels"] is None else labelNames[atoms["Labels"]]
+
+    # Create a list of tuples of (int, list) that contain the bonder (bondData[x][0]) and bondees (bondData[x][1][y])
+    bondBox = [float(box)] * 3 if "periodic" in options else None
+    bondTolerance = BOND_TOLERANCE if "radii" in options else None
+    bondData = bondCalculation(atoms, box=bondBox, tolerance=bondTolerance)
+
+    # Bond pairs in the order they are first found
+    bonds = uniqueBonds(bondData)
+
+    # Assign DREIDING labels automatically from the bonds
+    if labels is None and "type" in options:
+        import Dreiding_typing as dt
+        labels = dt.typeAtoms(elementSymbols[atoms["Elements"]], atoms["Coords"], bonds, bondBox).astype(str)
+
+    # Assign charge equilibration (QEq) charges to the Charge column
+    if "charges" in options:
+        import qeqFunctions as qf
+        atoms["Charges"] = qf.qeqCharges(elementSymbols[atoms["Elements"]], atoms["Coords"], bondBox)
+
+    return atoms, labels, bondData, bonds
+
+# Convert an .xyz file to moltemplate (or LAMMPS, with the 'lammps' option)
+# files in outputDirectory. box is the cubic cell size as a string, ff is the
+# forcefield name without extension and options are the xyzToMoltemplate
+# options. forcefieldData is the output of Dreiding_lammps.loadForceField, so
+# that many conversions can share it; otherwise the file from forcefieldPath is
+# read.
+def convertXYZ(xyzFile, box, ff, options, outputDirectory, forcefieldData=None):
+    # Post-process user input
+    name = os.path.splitext(os.path.basename(xyzFile))[0]
+    molecule = name.upper()
+    outputFile = name + ".lt"
+    forcefield = ff + ".lt"
+
+    # Supercell of the system.lt cell, only for a single molecule .lt
+    replicate = [int(option.split("=")[1]) for option in options if option.startswith("replicate=")]
+    replicate = replicate[0] if len(replicate) > 0 else 1
+    assert(replicate == 1 or not ("lammps" in options or "split" in options)), "replicate can't be used with the lammps or split options"
+
+    # Atoms, labels and bonds as set by the options
+    atoms, labels, bondData, bonds = prepareXYZ(xyzFile, box, options)
+
+    # Create atom names from element symbols and counter values
+    atomName = moltemplater(atoms)
+
+    os.makedirs(outputDirectory, exist_ok=True)
+    writeBondList(os.path.join(outputDirectory, molecule + '.bondlist.txt'), atomName, bondData)
+
+    # Write LAMMPS files directly
+    if "lammps" in options:
+        assert(labels is not None), "LAMMPS output needs DREIDING labels in place of element symbols, or the type option, in {}".format(xyzFile)
+        import Dreiding_lammps as dl
+
+        if forcefieldData is None:
+            forcefieldData = forcefieldPath(xyzFile, forcefield)
+
+        boxBounds = [[0.0, float(box)]] * 3
+        dl.writeLammps(os.path.join(outputDirectory, name), forcefieldData, list(labels), atoms["Charges"], atoms["Coords"], bonds, boxBounds)
+        return
+
+    # Write one molecule .lt per species of molecule
+    if "split" in options:
+        import speciesFunctions as sf
+        sf.writeSpecies(outputDirectory, name, forcefield, atoms, labels, bonds, box)
+        return
+
+    writeMolecule(os.path.join(outputDirectory, outputFile), forcefield, molecule, atomName, atoms, labels, bonds)
+    writeSystem(os.path.join(outputDirectory, "system.lt"), [outputFile], [molecule], box, replicate=replicate)
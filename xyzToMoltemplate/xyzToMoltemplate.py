@@ -1,6 +1,6 @@
 ##############################################################################
 # Developed by: Matthew Bone
-# Last Updated: 08/10/2020
+# Last Updated: 18/10/2026
 # Updated by: Matthew Bone
 #
 # Contact Details:
@@ -19,7 +19,34 @@
 # Argument 1 is the directory which is automatically filled. Argument 2 is xyz
 # file name without extension e.g. 'methanol'. Argument 3 is cubic cell box size
 # in angstroms e.g. '20.0'. Argument 4 is forcefield name without file extension
-# e.g. 'dreiding'.
+# e.g. 'dreiding'. Any further arguments are options:
+#   lammps - writes 'molecule'.data, 'molecule'.in.init and 'molecule'.in.settings
+#            for LAMMPS directly, without moltemplate, in place of the .lt files
+#   periodic - finds bonds across the cubic cell walls (minimum image)
+#   radii - bonds atoms within the sum of their DREIDING bond radii plus
+#           xf.BOND_TOLERANCE, in place of the 1.6 Angstrom cutoff
+#   type - assigns DREIDING labels to element-only .xyz files automatically
+#          from the bonds and geometry (Dreiding_typing.py)
+#   charges - assigns charge equilibration (QEq) charges from the coordinates
+#             (qeqFunctions.py), periodic if the periodic option is given;
+#             cells narrower than twice the 10 Angstrom cutoff include every
+#             periodic image within the cutoff
+#   split - splits the system into molecules and writes one 'molecule'_'formula'.lt
+#           per species of identical molecules (speciesFunctions.py). system.lt
+#           makes every molecule, with coordinates in 'molecule'.raw for
+#           moltemplate.sh -raw
+#   replicate=N - makes an N x N x N supercell of the cubic cell in system.lt;
+#                 not used with the lammps or split options
+#
+# The .xyz file can give DREIDING labels (e.g. C_R, H_HB) in place of element
+# symbols. Labels are then written to the 'molecule'.lt atoms and are required
+# for the 'lammps' mode (or given by 'type'), which reads the force field
+# parameters from the forcefield .lt file in the directory or in the repository
+# root.
+#
+# batchToMoltemplate.py converts many .xyz files at once and packToMoltemplate.py
+# packs copies of molecules into a cell at a target density. chainToMoltemplate.py
+# builds a polymer chain from a monomer.
 #
 # This file requires the library xyzFunctions.py
 ##############################################################################
@@ -27,106 +54,13 @@
 # Import packages
 import os
 import sys
-import math
-import numpy as np
-import pandas as pd
 import xyzFunctions as xf
 
 directory = sys.argv[1]
 name = sys.argv[2]
 box = sys.argv[3]
 ff = sys.argv[4]
+options = sys.argv[5:]
 
-# Set working directory
-os.chdir(directory)
-
-# Post-process user input
-filename = name + ".xyz"
-molecule = name.upper()
-outputFile = name + ".lt"
-forcefield = ff + ".lt"
-FORCEFIELD = ff.upper() # forcefield file must use uppercase function
-
-# Set up dictionaries
-atomDictionary = xf.atomDictionary
-
-# Import xyz file using np and convert to pd dataframe
-atomData = xf.xyzToDF(filename)
-
-# Create a list of tuples of (int, list) that contain the bonder (bondData[x][0]) and bondees (bondData[x][1][y])
-bondData = xf.bondCalculation(atomData)
-# Save current element list
-elementList = list(atomData['Element'])
-
-# Set for LAMMPS 'full' style
-dataStyle = " $mol:... @atom:"
-
-# Add necessary columns to dataframe
-atomData.insert(1, "Jargon", value="NaN")
-atomData.insert(2, "Charge", value=0.0)
-atomData["Jargon"] = dataStyle
-
-# Update atom names with counter values
-# Return list of atom names
-atomName = xf.moltemplater(atomData, atomDictionary)
-
-# Create readable list of bonds between atoms
-with open(molecule + '.bondlist.txt', 'w') as readableBonds:
-
-    for index, value1 in enumerate(bondData):
-        # Atom X ...
-        readableBonds.write("Atom: " + atomName[value1[0]] + "\n")
-        for value2 in bondData[index][1]:
-            # ... bonded with Atoms Y,Z, etc
-            readableBonds.write("Bonded with: " + atomName[value2] + "\n")
-        readableBonds.write("\n")
-
-# Write main file
-################################################################################
-# Open file
-with open(outputFile, 'w') as file:
-
-    # Begin molecule
-    file.write('import "' + forcefield + '" \n\n')
-    file.write(molecule + " inherits " + FORCEFIELD + " {\n")
-
-    # Write atom data
-    file.write('\twrite("Data Atoms") {\n')
-    np.savetxt(file, atomData, fmt='\t\t %s %s %s %f %f %f')
-    file.write('\n\t}\n')
-
-    # Write bond data
-    file.write('\twrite("Data Bond List") {\n')
-
-    # Preload counter and empty np array for storing already made bonds
-    bondCounter = 0
-    prevBond = np.empty((0,2), int)
-
-    # Write bonds section using earlier defined bond data
-    for index, value1 in enumerate(bondData):
-        for value2 in bondData[index][1]:
-            # Bond pairs that have already been will return a length of 1
-            repeat = np.where((prevBond == (value1[0], value2)).all(axis=1))[0]
-            if len(repeat) != 0:
-                continue # Stops bonds being repeated
-            file.write('\t\t$bond:' + str(bondCounter) + '\t$atom:' + str(atomName[value1[0]]) + '\t$atom:' + str(atomName[value2]) + '\n')
-            bondCounter += 1
-            prevBond = np.append(prevBond, np.array([[value2, value1[0]]]), axis = 0) # Flip order around to catch when p and q are reversed
-    file.write('\t}\n')
-
-    # Close molecule bracket and save file
-    file.write('}')
-
-
-# Write system.lt file
-################################################################################
-with open("system.lt", "w") as system:
-
-    # General setup of atom and cubic cell
-    system.write('import "' + outputFile + '"\n\n')
-    system.write("molecule = new " + molecule + " [1]\n\n")
-    system.write('write_once("Data Boundary") {\n')
-    system.write("\t0.0 " + box + " xlo xhi\n")
-    system.write("\t0.0 " + box + " ylo yhi\n")
-    system.write("\t0.0 " + box + " zlo zhi\n")
-    system.write("}\n\n")
+# Convert the xyz file in the directory, writing the output files alongside it
+xf.convertXYZ(os.path.join(directory, name + ".xyz"), box, ff, options, directory)